@@ -6,19 +6,38 @@ All business logic has been moved to modular services in the services/ directory
 """
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipResponder
+from fastapi.staticfiles import StaticFiles
+from fastapi.responses import FileResponse, ORJSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing_extensions import TypedDict
+from typing import List, Optional, Dict, Any, Tuple
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import anyio
 import json
+import logging
 import os
+import re
+import uuid
 import asyncio
 
 # =============================================================================
 # App Setup
 # =============================================================================
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Release shared resources (pooled LLM HTTP connections) on shutdown."""
+    yield
+    await llm_providers.close_http_client()
+
+
+# orjson encodes response bodies in C instead of the stdlib json module
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # Enable CORS for all origins
 app.add_middleware(
@@ -29,12 +48,48 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class _GZipExceptSSEResponder(GZipResponder):
+    """GZipResponder that sends Server-Sent Events uncompressed."""
+    
+    async def send_with_gzip(self, message):
+        await super().send_with_gzip(message)
+        if message["type"] == "http.response.start":
+            content_type = Headers(raw=message["headers"]).get("content-type", "")
+            # gzip would buffer events inside the compressor - pass the body
+            # through as-is, the same way an already-encoded response is
+            if content_type.startswith("text/event-stream"):
+                self.content_encoding_set = True
+
+
+class _GZipExceptSSEMiddleware(GZipMiddleware):
+    """
+    GZip responses >= minimum_size, but pass SSE streams through untouched.
+    
+    Decided per response from its content-type, so a route that can answer
+    either way (e.g. /v1/chat/completions with or without stream) still gets
+    its JSON replies compressed.
+    """
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and "gzip" in Headers(scope=scope).get("Accept-Encoding", ""):
+            responder = _GZipExceptSSEResponder(
+                self.app, self.minimum_size, compresslevel=self.compresslevel
+            )
+            await responder(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+
+# Compress large JSON responses (LLM output, code blocks, trace entries)
+app.add_middleware(_GZipExceptSSEMiddleware, minimum_size=1024)
+
 # =============================================================================
 # Import Services
 # =============================================================================
 
 from services import config
 from services import llm_providers
+from services import response_cache
 from services import context_files as context_files_service
 from services import projects as projects_service
 from services import pod_manager
@@ -51,6 +106,10 @@ from services import trace_log
 from services import design_tree_db
 from services import pre_llm
 from services import project_settings_db
+from services import terminal as terminal_service
+from services import secrets as secrets_service
+
+logger = logging.getLogger(__name__)
 
 # Alias for backward compatibility
 load_config = config.load_config
@@ -59,6 +118,40 @@ get_api_key = config.get_api_key
 parse_project_id = config.parse_project_id
 PROJECTS_DIR = config.PROJECTS_DIR
 
+# Worker pool for blocking subprocess calls so they don't stall the event loop
+_EXEC_POOL = ThreadPoolExecutor(max_workers=16)
+
+# Non-streaming chat completion responses, keyed by request content
+_response_cache = response_cache.TTLCache()
+
+
+def _resolve_route(model: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    Resolve the API key and provider route for a model in one step.
+    
+    Returns:
+        Tuple of (api_key, provider config from get_provider_and_headers)
+    
+    Raises:
+        HTTPException: 401 if the provider's API key is not configured
+    """
+    if llm_providers.is_minimax_model(model):
+        provider, label = "minimax", "MiniMax"
+    else:
+        provider, label = "openai", "OpenAI"
+    
+    api_key = get_api_key(provider)
+    if not api_key:
+        raise HTTPException(status_code=401, detail=f"{label} API key not configured")
+    
+    return api_key, llm_providers.get_provider_and_headers(model, api_key)
+
+
+async def _run_blocking(func, *args):
+    """Run a blocking function (e.g. run_code_in_pod) on the worker pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_EXEC_POOL, func, *args)
+
 # =============================================================================
 # Health Check
 # =============================================================================
@@ -133,7 +226,7 @@ async def execute_command_endpoint(request: CommandRequest):
     if command is None:
         return {"output": "Command blocked for safety", "exit_code": 1, "is_command": True, "is_error": True}
     
-    result = execute_command(command)
+    result = await execute_command(command)
     return {
         "output": result["output"],
         "exit_code": result["exit_code"],
@@ -145,7 +238,9 @@ async def execute_command_endpoint(request: CommandRequest):
 # Chat Completions Endpoint
 # =============================================================================
 
-class Message(BaseModel):
+class Message(TypedDict):
+    # TypedDict, not BaseModel: pydantic-core validates straight into plain
+    # dicts, so messages can be forwarded upstream without a dump/rebuild
     role: str
     content: str
 
@@ -161,29 +256,109 @@ class ChatRequest(BaseModel):
 @app.post("/v1/chat/completions")
 async def chat_completions(request: ChatRequest):
     """Handle chat completion requests."""
-    # Get API key from config or environment
-    if "minimax" in request.model.lower():
-        api_key = get_api_key("minimax")
-        if not api_key:
-            raise HTTPException(status_code=401, detail="MiniMax API key not configured")
-    else:
-        api_key = get_api_key("openai")
-        if not api_key:
-            raise HTTPException(status_code=401, detail="OpenAI API key not configured")
-    
-    # Convert messages to dict format
-    messages = [{"role": msg.role, "content": msg.content} for msg in request.messages]
+    # Get API key (raises 401 if not configured)
+    api_key, route = _resolve_route(request.model)
+    
+    messages = request.messages
+    
+    # Forward tokens as they arrive instead of buffering the whole completion
+    if request.stream:
+        return StreamingResponse(
+            llm_providers.stream_llm(
+                request.model,
+                messages,
+                request.temperature,
+                request.max_tokens,
+                api_key
+            ),
+            media_type="text/event-stream"
+        )
     
-    # Route to appropriate handler
-    result = await llm_providers.call_llm(
-        request.model,
-        messages,
-        request.temperature,
-        request.max_tokens,
-        api_key
+    # Identical non-streaming requests are answered from the response cache;
+    # a concurrent duplicate waits for the original instead of calling upstream
+    cache_key = response_cache.make_key(
+        request.model, messages, request.temperature, request.max_tokens
     )
+    await _response_cache.wait_inflight(cache_key)
+    cached = _response_cache.get(cache_key)
+    if cached is not None:
+        body, media_type = cached
+        return Response(content=body, media_type=media_type)
+    _response_cache.begin(cache_key)
+    
+    # OpenAI-compatible upstreams already answer in the client's format -
+    # relay the body bytes as they arrive instead of parsing and re-encoding
+    if route["provider"] != "minimax_anthropic":
+        try:
+            upstream = await llm_providers.send_openai_compatible(
+                request.model,
+                messages,
+                request.temperature,
+                request.max_tokens,
+                route["endpoint"],
+                api_key
+            )
+        except BaseException:
+            _response_cache.end(cache_key)
+            raise
+        return _RelayResponse(upstream, cache_key)
+    
+    # Anthropic-format upstream needs translating to the OpenAI shape
+    try:
+        result = await llm_providers.call_llm(
+            request.model,
+            messages,
+            request.temperature,
+            request.max_tokens,
+            api_key
+        )
+        # Upstream JSON is already plain builtins - skip jsonable_encoder's walk
+        response = ORJSONResponse(result)
+        _response_cache.set(cache_key, (response.body, "application/json"))
+    finally:
+        _response_cache.end(cache_key)
     
-    return result
+    return response
+
+
+async def _relay_and_cache(upstream, cache_key: str):
+    """Relay upstream body bytes, caching the full body if it completed with 200."""
+    chunks = []
+    async for chunk in upstream.aiter_bytes():
+        chunks.append(chunk)
+        yield chunk
+    if upstream.status_code == 200:
+        media_type = upstream.headers.get("content-type", "application/json")
+        _response_cache.set(cache_key, (b"".join(chunks), media_type))
+
+
+class _RelayResponse(StreamingResponse):
+    """
+    Stream an upstream httpx response to the client via _relay_and_cache.
+    
+    The in-flight marker is released and the upstream closed in __call__'s
+    finally rather than in the generator or a BackgroundTask: if the client
+    disconnects before the body starts, the generator never runs (so its
+    finally wouldn't either) and background tasks are skipped.
+    """
+    
+    def __init__(self, upstream, cache_key: str):
+        super().__init__(
+            _relay_and_cache(upstream, cache_key),
+            status_code=upstream.status_code,
+            media_type=upstream.headers.get("content-type", "application/json")
+        )
+        self._upstream = upstream
+        self._cache_key = cache_key
+    
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            _response_cache.end(self._cache_key)
+            # Shielded - this may run while the request is being cancelled
+            with anyio.CancelScope(shield=True):
+                await self._upstream.aclose()
 
 
 # =============================================================================
@@ -202,15 +377,8 @@ async def simple_chat(request: SimpleChatRequest):
     Simple chat endpoint - just LLM conversation, no code execution.
     Use this for chat mode, use terminal for command execution.
     """
-    # Get API key
-    if "minimax" in request.model.lower():
-        api_key = get_api_key("minimax")
-        if not api_key:
-            raise HTTPException(status_code=401, detail="MiniMax API key not configured")
-    else:
-        api_key = get_api_key("openai")
-        if not api_key:
-            raise HTTPException(status_code=401, detail="OpenAI API key not configured")
+    # Get API key (raises 401 if not configured)
+    api_key, _ = _resolve_route(request.model)
     
     # Build messages
     messages = request.messages + [{"role": "user", "content": request.prompt}]
@@ -312,15 +480,8 @@ async def design_chat(request: DesignRequest):
     pre_llm_content = prep_result["pre_llm_content"]
     messages = prep_result["messages"]
     
-    # Get API key
-    if "minimax" in request.model.lower():
-        api_key = get_api_key("minimax")
-        if not api_key:
-            raise HTTPException(status_code=401, detail="MiniMax API key not configured")
-    else:
-        api_key = get_api_key("openai")
-        if not api_key:
-            raise HTTPException(status_code=401, detail="OpenAI API key not configured")
+    # Get API key (raises 401 if not configured)
+    api_key, _ = _resolve_route(request.model)
     
     # Call LLM
     result = await llm_providers.call_llm(
@@ -477,7 +638,7 @@ async def process_prompt(request: PromptRequest):
     
     if is_cmd and command:
         # Execute command directly (not in pod for direct commands)
-        result = execute_command(command)
+        result = await execute_command(command)
         return {
             "type": "command",
             "output": result["output"],
@@ -494,15 +655,8 @@ async def process_prompt(request: PromptRequest):
         # Pass to LLM - build messages and call API
         messages = request.messages + [{"role": "user", "content": prompt}]
         
-        # Get API key
-        if "minimax" in request.model.lower():
-            api_key = get_api_key("minimax")
-            if not api_key:
-                raise HTTPException(status_code=401, detail="MiniMax API key not configured")
-        else:
-            api_key = get_api_key("openai")
-            if not api_key:
-                raise HTTPException(status_code=401, detail="OpenAI API key not configured")
+        # Get API key (raises 401 if not configured)
+        api_key, _ = _resolve_route(request.model)
         
         # Call LLM
         llm_result = await llm_providers.call_llm(
@@ -524,8 +678,8 @@ async def process_prompt(request: PromptRequest):
         
         for block in code_blocks:
             if use_pod:
-                # Run in pod with project context
-                exec_result = run_code_in_pod(block['code'], project_path)
+                # Run in pod with project context (off the event loop)
+                exec_result = await _run_blocking(run_code_in_pod, block['code'], project_path)
                 execution_results.append({
                     "code": block['code'],
                     "language": block['language'],
@@ -536,8 +690,9 @@ async def process_prompt(request: PromptRequest):
                     "ran_in_pod": True
                 })
             else:
-                # Run locally (no project selected)
-                exec_result = execute_command(block['code'])
+                # Run locally (no project selected) - blocks are sequential steps,
+                # so keep their order but don't block the event loop
+                exec_result = await execute_command(block['code'])
                 execution_results.append({
                     "code": block['code'],
                     "language": block['language'],
@@ -579,7 +734,7 @@ async def run_looper(request: LooperRequest):
     
     if is_cmd and command:
         # Execute command directly and return result
-        result = execute_command(command)
+        result = await execute_command(command)
         return {
             "success": True,
             "type": "command",
@@ -621,15 +776,8 @@ async def run_looper(request: LooperRequest):
     if not project_name:
         project_name = "default"
     
-    # Get API key
-    if "minimax" in request.model.lower():
-        api_key = get_api_key("minimax")
-        if not api_key:
-            raise HTTPException(status_code=401, detail="MiniMax API key not configured")
-    else:
-        api_key = get_api_key("openai")
-        if not api_key:
-            raise HTTPException(status_code=401, detail="OpenAI API key not configured")
+    # Get API key (raises 401 if not configured)
+    api_key, _ = _resolve_route(request.model)
     
     # Get LLM call function
     call_llm_func = llm_providers.get_llm_call_function(request.model, api_key)
@@ -689,14 +837,13 @@ async def trace_stream():
         state = get_looper_state()
         
         while state.is_running or last_index < len(trace_logger):
-            # Check for new entries - use get_all() for thread-safe access
-            all_entries = trace_logger.get_all()
-            if last_index < len(all_entries):
-                # Send new entries
-                new_entries = all_entries[last_index:]
-                for entry in new_entries:
-                    yield f"data: {json.dumps(entry)}\n\n"
-                    last_index += 1
+            # Check for new entries - get_since() is thread-safe and only
+            # serializes entries not sent yet (get_all() redid the whole log
+            # on every poll)
+            new_entries = trace_logger.get_since(last_index)
+            for entry in new_entries:
+                yield f"data: {json.dumps(entry)}\n\n"
+                last_index += 1
             
             # Small delay to avoid tight loop
             await asyncio.sleep(0.5)
@@ -732,7 +879,8 @@ async def get_trace(trace_id: str, since_index: int = 0):
         since_index: Return entries from this index onwards
     """
     entries = trace_log.get_trace_entries(trace_id, since_index)
-    return {"entries": entries, "trace_id": trace_id}
+    # Entries come straight from the JSON log file - skip jsonable_encoder's walk
+    return ORJSONResponse({"entries": entries, "trace_id": trace_id})
 
 
 @app.delete("/api/trace/{trace_id}")
@@ -750,8 +898,7 @@ async def clear_trace():
     
     # Also clear the persistent trace file
     try:
-        from services.trace_log import clear_trace_log
-        clear_trace_log()  # Clear all entries from trace.json
+        trace_log.clear_trace_log()  # Clear all entries from trace.json
     except Exception as e:
         pass
     
@@ -789,9 +936,9 @@ async def serve_command():
 async def serve_design():
     return FileResponse("static/design.html")
 
-@app.get("/static/{file_path:path}")
-async def serve_static(file_path: str):
-    return FileResponse(f"static/{file_path}")
+# StaticFiles handles ETag/Last-Modified (304s skip the body) and rejects
+# paths that escape the static directory
+app.mount("/static", StaticFiles(directory=Path(__file__).parent / "static"), name="static")
 
 # =============================================================================
 # Agents Endpoints
@@ -892,8 +1039,8 @@ async def add_context_file(file: ContextFileRequest):
     # New ID format: {name}_{type}
     file_id = f"{file.name}_{file.type}"
     
-    # Check if file already exists
-    existing_result = context_files_service.load_context_files()
+    # Check if file already exists (ids only - no need to read contents)
+    existing_result = context_files_service.load_context_files(include_content=False)
     if isinstance(existing_result, dict):
         existing_files = existing_result.get("files", [])
     else:
@@ -929,9 +1076,6 @@ async def add_context_file(file: ContextFileRequest):
 @app.put("/api/context-files/{file_id}")
 async def update_context_file(file_id: str, file: ContextFileRequest):
     """Update an existing context file."""
-    import logging
-    logger = logging.getLogger(__name__)
-    
     # Use new ID format: {name}_{type}
     new_file_id = f"{file.name}_{file.type}"
     
@@ -941,7 +1085,7 @@ async def update_context_file(file_id: str, file: ContextFileRequest):
     if new_file_id != file_id:
         logger.info(f"[CONTEXT FILES] ID changed, deleting old file: {file_id}")
         # First, check if a file already exists with the new ID
-        existing_result = context_files_service.load_context_files()
+        existing_result = context_files_service.load_context_files(include_content=False)
         if isinstance(existing_result, dict):
             existing_files = existing_result.get("files", [])
         else:
@@ -1002,9 +1146,6 @@ async def get_project_context_settings(project_id: str):
 @app.post("/api/projects/{project_id}/context-settings")
 async def update_project_context_settings(project_id: str, settings: Dict[str, str]):
     """Update context file settings for a project."""
-    import logging
-    logger = logging.getLogger(__name__)
-    
     # Save the settings first
     context_files_service.save_project_context_settings(project_id, settings)
     
@@ -1027,9 +1168,7 @@ async def update_project_context_settings(project_id: str, settings: Dict[str, s
         # We need to do this before saving any files
         parts = project_id.split('-', 1)
         if len(parts) == 2:
-            from pathlib import Path
             user_name, project_name = parts
-            PROJECTS_DIR = Path(__file__).parent / "user_login"
             proj_context_dir = PROJECTS_DIR / user_name / project_name / "proj_context"
             if proj_context_dir.exists():
                 for md_file in proj_context_dir.glob("*.md"):
@@ -1273,9 +1412,6 @@ async def reset_pod_by_name(pod_name: str):
 # =============================================================================
 # Terminal Endpoints (Interactive Command Mode)
 # =============================================================================
-import uuid
-from services import terminal as terminal_service
-from services import secrets as secrets_service
 
 
 class TerminalStartRequest(BaseModel):
@@ -1508,7 +1644,6 @@ def _update_settings_in_context_file(content: str, settings: Dict[str, Any]) ->
         
         # Update existing setting (skip duplicates - don't add them)
         if in_settings_section and ':**' in line:
-            import re
             match = re.search(r'\*\*(\w+)\*\*:', line)
             if match:
                 key = match.group(1)
@@ -1645,4 +1780,7 @@ async def update_project_settings(project_id: str, settings: ProjectSettings):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=51164)
+    # "auto" picks uvloop + httptools when installed (see requirements.txt) and
+    # falls back to asyncio + h11 elsewhere. Stays single-worker: looper state,
+    # response cache and terminal sessions all live in this process.
+    uvicorn.run(app, host="0.0.0.0", port=51164, loop="auto", http="auto")
@@ -6,7 +6,9 @@ This package contains all the modular services for the Aelilobster application.
 Modules:
 - config: Configuration and API key management
 - llm_providers: LLM provider setup and calling (MiniMax, OpenAI)
+- response_cache: TTL cache for chat completion responses
 - context_files: Context file CRUD operations
+- file_io: Atomic file writes
 - projects: Project management
 - pod_manager: Pod execution and management
 - command_service: Command detection and execution
@@ -20,7 +22,9 @@ Modules:
 from services.config import (
     load_config,
     save_config,
+    config_transaction,
     get_api_key,
+    refresh_api_keys,
     parse_project_id,
     PROJECTS_DIR,
 )
@@ -5,6 +5,42 @@ Extracts code blocks from LLM responses and returns them for execution.
 import re
 from typing import List, Dict, Any, Optional
 
+# One scanner for all three block kinds so the response is walked once:
+#   fenced    - ```language ... ``` (the standard way LLMs return code)
+#   backtick  - single backtick commands like `ls` or `ls -la`
+#   inline    - lines starting with $ or > (shell prompt style); matched inside
+#               a lookahead so backtick spans on the same line are still seen
+_BLOCK_RE = re.compile(
+    r'```(?P<lang>\w*)\n?(?P<fenced>.*?)```'
+    r'|`(?P<backtick>[^`]+)`'
+    r'|(?=^[ \t]*[$>][ \t]*(?P<inline>\S[^\n]*))',
+    re.DOTALL | re.MULTILINE
+)
+
+# Openers that indicate conversational/non-code text, as one alternation
+# so a block is checked in a single match instead of a loop over patterns
+_CONVERSATIONAL_RE = re.compile(
+    r"^(?:Let me|I will|I can|Sure,|Here|Okay,|Yes,|No,|I'll|I would|"
+    r"First,|Then,|Finally,|To do this,|You can|You need|This will|Let's)",
+    re.IGNORECASE
+)
+# First letters of every opener above, both cases
+_CONVERSATIONAL_FIRST = frozenset("LISHOYNFTlishoynft")
+
+
+def _is_conversational(code: str) -> bool:
+    """Check if code looks like conversational text, not actual code."""
+    code_stripped = code.strip()
+    # Too short to be real code (less than 20 chars)
+    if len(code_stripped) < 20:
+        return True
+    # Conversational opener - only worth a regex match when the first letter
+    # could start one, which rules out most real code immediately
+    if code_stripped[0] in _CONVERSATIONAL_FIRST and _CONVERSATIONAL_RE.match(code_stripped):
+        return True
+    # Mostly sentence-like text
+    return code_stripped.startswith(('The ', 'This '))
+
 
 def extract_code_blocks(text: str) -> List[Dict[str, Any]]:
     """
@@ -16,54 +52,49 @@ def extract_code_blocks(text: str) -> List[Dict[str, Any]]:
     """
     code_blocks = []
     
-    # Pattern for fenced code blocks (```language ... ```)
-    # This is the standard way LLMs return code
-    fenced_pattern = r'```(\w*)\n?(.*?)```'
-    matches = re.findall(fenced_pattern, text, re.DOTALL)
-    
-    fenced_codes = []  # Store fenced codes for duplicate detection
-    
-    # Patterns that indicate conversational/non-code text
-    conversational_patterns = [
-        r'^Let me',
-        r'^I will',
-        r'^I can',
-        r'^Sure,',
-        r'^Here',
-        r'^Okay,',
-        r'^Yes,',
-        r'^No,',
-        r'^I\'ll',
-        r'^I would',
-        r'^First,',
-        r'^Then,',
-        r'^Finally,',
-        r'^To do this,',
-        r'^You can',
-        r'^You need',
-        r'^This will',
-        r'^Let\'s',
-    ]
-    
-    def is_conversational(code: str) -> bool:
-        """Check if code looks like conversational text, not actual code."""
-        code_stripped = code.strip()
-        # Check for conversational patterns at the start
-        for pattern in conversational_patterns:
-            if re.match(pattern, code_stripped, re.IGNORECASE):
-                return True
-        # Check if it's too short to be real code (less than 20 chars)
-        if len(code_stripped) < 20:
-            return True
-        # Check if it's mostly sentence-like text
-        if code_stripped.startswith('The ') or code_stripped.startswith('This '):
-            return True
-        return False
+    # Single pass over the text, bucketed by kind (each bucket stays in text order)
+    matches = []
+    single_matches = []
+    inline_matches = []
+    
+    def scan(chunk: str) -> None:
+        for m in _BLOCK_RE.finditer(chunk):
+            kind = m.lastgroup
+            if kind == "fenced":
+                code = m.group("fenced")
+                matches.append((m.group("lang"), code))
+                # Conversational text wrapped in a fence is skipped below, but
+                # commands written inside it still count
+                if code.strip() and _is_conversational(code):
+                    scan(code)
+            elif kind == "backtick":
+                single_matches.append(m.group("backtick"))
+            else:
+                inline_matches.append(m.group("inline"))
+    
+    scan(text)
+    
+    # Duplicate detection: exact matches via a set, "contained in a known block"
+    # via one substring scan of a NUL-joined blob (NUL never appears in LLM text,
+    # so a hit cannot straddle two blocks), and "contains a known block" only
+    # against blocks short enough to fit inside a backtick command
+    fenced_set = set()
+    fenced_blob = ""
+    short_codes = []
+    shortest_code = 100  # length gate: a cmd shorter than every short code can't contain one
+    
+    def remember(code: str) -> None:
+        nonlocal fenced_blob, shortest_code
+        fenced_set.add(code)
+        fenced_blob += "\0" + code
+        if len(code) < 100:
+            short_codes.append(code)
+            shortest_code = min(shortest_code, len(code))
     
     for lang, code in matches:
         if code.strip():
             # Skip conversational text that got wrapped in code blocks
-            if is_conversational(code):
+            if _is_conversational(code):
                 print(f"[DEBUG extract_code_blocks] Skipping conversational text: {code[:50]}...")
                 continue
             code_blocks.append({
@@ -71,52 +102,47 @@ def extract_code_blocks(text: str) -> List[Dict[str, Any]]:
                 'code': code.strip(),
                 'type': 'fenced'
             })
-            fenced_codes.append(code.strip())
+            remember(code.strip())
     
-    # Pattern for single backtick commands like `ls` or `ls -la`
-    # These often appear in LLM explanations like: use `ls` to list files
-    single_backtick_pattern = r'`([^`]+)`'
-    single_matches = re.findall(single_backtick_pattern, text)
+    # Single backtick commands often appear in LLM explanations like: use `ls` to list files
     for cmd in single_matches:
         cmd = cmd.strip()
         # Skip conversational text in backticks
-        if is_conversational(cmd):
+        if _is_conversational(cmd):
             print(f"[DEBUG extract_code_blocks] Skipping conversational backtick: {cmd[:50]}...")
             continue
         # Only add if it looks like a command (has spaces, or is short)
         if cmd and not cmd.startswith('#') and len(cmd) < 100:
             # Check if already in fenced or duplicate
-            is_duplicate = any(cmd in fc or fc in cmd for fc in fenced_codes)
+            is_duplicate = (
+                cmd in fenced_set
+                or cmd in fenced_blob
+                or (len(cmd) >= shortest_code and any(fc in cmd for fc in short_codes))
+            )
             if not is_duplicate:
                 code_blocks.append({
                     'language': 'shell',
                     'code': cmd,
                     'type': 'single-backtick'
                 })
-                fenced_codes.append(cmd)
-    
-    # Pattern for inline code that looks like shell commands
-    # Lines starting with $ or > at the start
-    inline_pattern = r'^(?:\$\s*|>\s*)(.+)$'
-    lines = text.split('\n')
-    for line in lines:
-        match = re.match(inline_pattern, line.strip())
-        if match:
-            cmd = match.group(1).strip()
-            # Skip conversational text
-            if is_conversational(cmd):
-                print(f"[DEBUG extract_code_blocks] Skipping conversational inline: {cmd[:50]}...")
-                continue
-            # Only add if it looks like a command and is not already in a fenced block
-            if cmd and not cmd.startswith('#'):
-                # Check if this inline command is already contained in any fenced block
-                is_duplicate = any(cmd in fenced_code for fenced_code in fenced_codes)
-                if not is_duplicate:
-                    code_blocks.append({
-                        'language': 'shell',
-                        'code': cmd,
-                        'type': 'inline'
-                    })
+                remember(cmd)
+    
+    # Inline code that looks like shell commands
+    for cmd in inline_matches:
+        cmd = cmd.strip()
+        # Skip conversational text
+        if _is_conversational(cmd):
+            print(f"[DEBUG extract_code_blocks] Skipping conversational inline: {cmd[:50]}...")
+            continue
+        # Only add if it looks like a command and is not already in a fenced block
+        if cmd and not cmd.startswith('#'):
+            # Check if this inline command is already contained in any fenced block
+            if cmd not in fenced_set and cmd not in fenced_blob:
+                code_blocks.append({
+                    'language': 'shell',
+                    'code': cmd,
+                    'type': 'inline'
+                })
     
     return code_blocks
 
@@ -2,12 +2,15 @@
 Command detection and execution service.
 Determines if a user prompt is a Linux command or should be passed to LLM.
 """
-import subprocess
+import asyncio
+import functools
 import re
-from typing import Tuple, Dict, Any, Optional
+import shlex
+import shutil
+from typing import Tuple, Dict, Any, List, Optional
 
 # Linux commands that should be executed directly
-LINUX_COMMANDS = {
+LINUX_COMMANDS = frozenset({
     'ls', 'pwd', 'cat', 'echo', 'find', 'grep', 'cd', 'mkdir', 'touch', 
     'rm', 'cp', 'mv', 'chmod', 'chown', 'chgrp', 'df', 'du', 'free', 
     'top', 'ps', 'kill', 'killall', 'curl', 'wget', 'git', 'npm', 
@@ -22,7 +25,7 @@ LINUX_COMMANDS = {
     'apt', 'apt-get', 'yum', 'dnf', 'pacman', 'brew', 'snap', 'flatpak',
     'tree', 'ln', 'stat', 'file', 'md5sum', 'sha256sum', 'base64',
     'date', 'cal', 'sleep', 'wait', 'read', 'printf', 'test'
-}
+})
 
 # Dangerous commands that should be blocked
 DANGEROUS_COMMANDS = [
@@ -39,6 +42,15 @@ COMMAND_PATTERNS = [
     r'^~[a-zA-Z0-9_\-/.]*',  # home directory
 ]
 
+# Compiled once: a single scan finds any dangerous substring, and one match
+# covers every command pattern
+_DANGEROUS_RE = re.compile('|'.join(re.escape(d) for d in DANGEROUS_COMMANDS))
+_COMMAND_RE = re.compile('|'.join(f'(?:{p})' for p in COMMAND_PATTERNS))
+
+# Anything the shell would interpret (pipes, chaining, redirects, expansion,
+# globbing, leading VAR=value assignments) - such commands still go through /bin/sh
+_SHELL_SYNTAX_RE = re.compile(r'[|&;<>()$`\\*?\[\]{}~!#\n]|^\s*[A-Za-z_][A-Za-z0-9_]*=')
+
 
 def is_linux_command(prompt: str) -> Tuple[bool, Optional[str]]:
     """
@@ -50,9 +62,8 @@ def is_linux_command(prompt: str) -> Tuple[bool, Optional[str]]:
     prompt = prompt.strip()
     
     # Check for dangerous commands first
-    for dangerous in DANGEROUS_COMMANDS:
-        if dangerous in prompt:
-            return True, None  # Command, but blocked
+    if _DANGEROUS_RE.search(prompt):
+        return True, None  # Command, but blocked
     
     # Check if it starts with a known Linux command
     words = prompt.split()
@@ -66,57 +77,123 @@ def is_linux_command(prompt: str) -> Tuple[bool, Optional[str]]:
             return True, prompt
     
     # Check against patterns
-    for pattern in COMMAND_PATTERNS:
-        if re.match(pattern, prompt):
-            # Verify it's actually a known command
-            first_word = prompt.split()[0] if prompt.split() else ''
-            first_word = first_word.replace('sudo ', '').replace('sudo', '')
-            if first_word in LINUX_COMMANDS or first_word.startswith('/') or first_word.startswith('./'):
-                return True, prompt
+    if _COMMAND_RE.match(prompt):
+        # Verify it's actually a known command
+        first_word = words[0] if words else ''
+        first_word = first_word.replace('sudo ', '').replace('sudo', '')
+        if first_word in LINUX_COMMANDS or first_word.startswith(('/', './')):
+            return True, prompt
     
     return False, None
 
 
-def execute_command(command: str, cwd: str = "/home/aeli/projects/aelilobster", timeout: int = 30) -> Dict[str, Any]:
+# Output cap (characters) returned to callers. Pipes are buffered up to this
+# many UTF-8 bytes; anything beyond is drained and discarded so memory stays
+# bounded no matter how much a command prints
+OUTPUT_LIMIT = 50000
+_OUTPUT_BYTES = OUTPUT_LIMIT * 4
+
+
+async def _read_capped(stream: asyncio.StreamReader, limit: int) -> bytes:
+    """Read a pipe to EOF, keeping at most limit bytes."""
+    buf = bytearray()
+    while True:
+        chunk = await stream.read(65536)
+        if not chunk:
+            return bytes(buf)
+        if len(buf) < limit:
+            buf += chunk[:limit - len(buf)]
+
+
+@functools.lru_cache(maxsize=256)
+def _which(name: str) -> Optional[str]:
+    """Resolve an executable on PATH (cached - PATH is fixed for the process)."""
+    return shutil.which(name)
+
+
+def _direct_argv(command: str) -> Optional[List[str]]:
+    """
+    Split a command into argv when it can be exec'd without a shell.
+    
+    Returns None for anything needing shell semantics: shell syntax, builtins
+    like cd/export (no binary on PATH), or relative/absolute script paths.
+    """
+    if _SHELL_SYNTAX_RE.search(command):
+        return None
+    try:
+        argv = shlex.split(command)
+    except ValueError:
+        return None
+    if not argv or "/" in argv[0]:
+        return None
+    if _which(argv[0]) is None:
+        return None
+    return argv
+
+
+async def execute_command(command: str, cwd: str = "/home/aeli/projects/aelilobster", timeout: int = 30) -> Dict[str, Any]:
     """
     Execute a Linux command and return the output.
     
+    Plain commands are exec'd directly; anything using shell syntax runs
+    through /bin/sh. Either way the event loop is not blocked.
+    
     Returns:
         Dict with 'output', 'exit_code', 'is_error' keys
     """
     # Final safety check
-    for dangerous in DANGEROUS_COMMANDS:
-        if dangerous in command:
+    dangerous = _DANGEROUS_RE.search(command)
+    if dangerous:
+        return {
+            "output": f"Command blocked for safety: {dangerous.group(0)}",
+            "exit_code": 1,
+            "is_error": True
+        }
+    
+    try:
+        argv = _direct_argv(command)
+        if argv is not None:
+            proc = await asyncio.create_subprocess_exec(
+                *argv,
+                executable=_which(argv[0]),
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=cwd
+            )
+        else:
+            proc = await asyncio.create_subprocess_shell(
+                command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=cwd
+            )
+        
+        try:
+            stdout, stderr, _ = await asyncio.wait_for(
+                asyncio.gather(
+                    _read_capped(proc.stdout, _OUTPUT_BYTES),
+                    _read_capped(proc.stderr, _OUTPUT_BYTES),
+                    proc.wait()
+                ),
+                timeout
+            )
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
             return {
-                "output": f"Command blocked for safety: {dangerous}",
-                "exit_code": 1,
+                "output": "Command timed out after {} seconds".format(timeout),
+                "exit_code": 124,
                 "is_error": True
             }
-    
-    try:
-        result = subprocess.run(
-            command,
-            shell=True,
-            capture_output=True,
-            text=True,
-            timeout=timeout,
-            cwd=cwd
-        )
         
-        output = result.stdout + result.stderr
+        output = (stdout + stderr).decode(errors="replace")
         if not output:
             output = "(no output)"
         
         return {
-            "output": output[:50000],  # Limit output size
-            "exit_code": result.returncode,
-            "is_error": result.returncode != 0
-        }
-    except subprocess.TimeoutExpired:
-        return {
-            "output": "Command timed out after {} seconds".format(timeout),
-            "exit_code": 124,
-            "is_error": True
+            "output": output[:OUTPUT_LIMIT],  # Limit output size
+            "exit_code": proc.returncode,
+            "is_error": proc.returncode != 0
         }
     except Exception as e:
         return {
@@ -126,7 +203,7 @@ def execute_command(command: str, cwd: str = "/home/aeli/projects/aelilobster",
         }
 
 
-def process_prompt(prompt: str, llm_callback=None, cwd: str = "/home/aeli/projects/aelilobster") -> Dict[str, Any]:
+async def process_prompt(prompt: str, llm_callback=None, cwd: str = "/home/aeli/projects/aelilobster") -> Dict[str, Any]:
     """
     Process a user prompt - either execute as command or pass to LLM.
     
@@ -147,7 +224,7 @@ def process_prompt(prompt: str, llm_callback=None, cwd: str = "/home/aeli/projec
                 "result": "Command blocked for safety reasons"
             }
         
-        result = execute_command(command, cwd)
+        result = await execute_command(command, cwd)
         return {
             "type": "command",
             "result": result["output"],
@@ -2,12 +2,18 @@
 Configuration Service
 Handles loading/saving config and managing API keys.
 """
-import json
+import contextlib
+import copy
+import orjson
 import os
+import threading
 from pathlib import Path
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, Iterator, Optional, Tuple
 
-from services.naming import parse_project_id as parse_project_id_normalized
+from services.file_io import atomic_write_bytes
+
+# Re-exported as-is so callers hit naming's lru_cache without an extra call frame
+from services.naming import parse_project_id
 
 # Configuration file path
 CONFIG_FILE = Path(__file__).parent.parent / "config.json"
@@ -15,54 +21,106 @@ CONFIG_FILE = Path(__file__).parent.parent / "config.json"
 # Projects directory
 PROJECTS_DIR = Path(__file__).parent.parent / "user_login"
 
+# Parsed config cached by file mtime - (st_mtime_ns, config) or None
+_config_cache: Optional[Tuple[int, Dict[str, Any]]] = None
+_config_lock = threading.Lock()
+# Serializes config_transaction read-modify-write cycles
+_transaction_lock = threading.Lock()
+
+# provider -> (config key, environment variable) for its API key
+_API_KEY_SOURCES = {
+    "minimax": ("minimax_api_key", "MINIMAX_API_KEY"),
+    "openai": ("openai_api_key", "OPENAI_API_KEY"),
+}
+# Resolved API keys snapshot - taken on first use, refreshed by save_config
+_api_keys: Optional[Dict[str, str]] = None
+
 
-def parse_project_id(project_id: str) -> Tuple[Optional[str], Optional[str]]:
+def _cached_config() -> Dict[str, Any]:
     """
-    Parse project_id into (user_name, project_name).
+    Return the parsed config, re-reading the file only when its mtime changes.
     
-    Uses centralized naming module for consistency.
-    Supports formats:
-    - user-project (hyphen): "test_user-myproject" -> ("test_user", "myproject")
-    - user_project (underscore): "test_user_myproject" -> ("test_user", "myproject")
-    
-    Returns (None, None) if invalid format.
+    The returned dict is shared - callers must copy it before mutating.
     """
-    return parse_project_id_normalized(project_id)
+    global _config_cache
+    try:
+        mtime = CONFIG_FILE.stat().st_mtime_ns
+    except OSError:
+        return {}
+    
+    cache = _config_cache
+    if cache is not None and cache[0] == mtime:
+        return cache[1]
+    
+    with _config_lock:
+        try:
+            config = orjson.loads(CONFIG_FILE.read_bytes())
+        except (OSError, ValueError):
+            return {}
+        _config_cache = (mtime, config)
+        return config
 
 
 def load_config() -> Dict[str, Any]:
-    """Load config from file."""
-    if CONFIG_FILE.exists():
-        try:
-            with open(CONFIG_FILE, "r") as f:
-                return json.load(f)
-        except:
-            return {}
-    return {}
+    """Load config from file (cached until the file changes)."""
+    # Shallow copy so callers can set top-level keys before save_config
+    return dict(_cached_config())
 
 
 def save_config(config: Dict[str, Any]) -> None:
     """Save config to file."""
-    with open(CONFIG_FILE, "w") as f:
-        json.dump(config, f, indent=2)
+    global _config_cache
+    with _config_lock:
+        atomic_write_bytes(CONFIG_FILE, orjson.dumps(config, option=orjson.OPT_INDENT_2))
+        _config_cache = None
+    refresh_api_keys()
+
+
+@contextlib.contextmanager
+def config_transaction() -> Iterator[Dict[str, Any]]:
+    """
+    Read-modify-write the config atomically with respect to other transactions.
+    
+    Yields a private deep copy of the config (so nested dicts can be mutated
+    without touching the cached one) and saves it when the block exits
+    without raising.
+    
+    Example:
+        with config_transaction() as cfg:
+            cfg.setdefault("project_context_settings", {})[project_id] = settings
+    """
+    with _transaction_lock:
+        config = copy.deepcopy(_cached_config())
+        yield config
+        save_config(config)
+
+
+def refresh_api_keys() -> Dict[str, str]:
+    """Re-resolve every provider's API key from config.json and the environment."""
+    global _api_keys
+    config = _cached_config()
+    _api_keys = {
+        provider: config.get(config_key, os.getenv(env_var, ""))
+        for provider, (config_key, env_var) in _API_KEY_SOURCES.items()
+    }
+    return _api_keys
 
 
 def get_api_key(provider: str) -> str:
     """
     Get API key for a provider from config or environment.
     
+    Keys are resolved once and reused; save_config (or refresh_api_keys,
+    after editing config.json by hand) re-resolves them.
+    
     Args:
         provider: One of "minimax" or "openai"
     
     Returns:
         The API key string (empty if not configured)
     """
-    config = load_config()
-    if provider.lower() == "minimax":
-        return config.get("minimax_api_key", os.getenv("MINIMAX_API_KEY", ""))
-    elif provider.lower() == "openai":
-        return config.get("openai_api_key", os.getenv("OPENAI_API_KEY", ""))
-    return ""
+    keys = _api_keys if _api_keys is not None else refresh_api_keys()
+    return keys.get(provider.lower(), "")
 
 
 def get_projects_dir() -> Path:
@@ -2,10 +2,17 @@
 Context Files Service
 Handles CRUD operations for context files stored as markdown files.
 """
-import json
+import logging
+import orjson
+import mmap
 import os
+import re
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+from services.config import config_transaction, load_config
+from services.file_io import atomic_write_bytes
+
+logger = logging.getLogger(__name__)
 
 # Context files directory
 CONTEXT_FILES_DIR = Path(__file__).parent.parent / "context_files"
@@ -14,6 +21,10 @@ FILE_TYPES_FILE = CONTEXT_FILES_DIR / "file_types.json"
 # Projects directory for project-specific context files
 PROJECTS_DIR = Path(__file__).parent.parent / "user_login"
 
+# Characters stripped from context file names - \w is Unicode-aware, so this
+# keeps exactly what str.isalnum() accepts plus "-" and "_"
+_UNSAFE_NAME_RE = re.compile(r"[^\w-]+")
+
 # Default file types (permanent list)
 DEFAULT_FILE_TYPES = [
     "pre-llm",
@@ -26,10 +37,20 @@ DEFAULT_FILE_TYPES = [
     "post-execute",
     "pre-display"
 ]
+# Same types as a set, for O(1) membership checks
+DEFAULT_FILE_TYPES_SET = frozenset(DEFAULT_FILE_TYPES)
+
+# Files at least this large are mmap'd instead of read into a buffer
+MMAP_THRESHOLD = 64 * 1024
 
 # Create the context_files directory if it doesn't exist
 CONTEXT_FILES_DIR.mkdir(exist_ok=True)
 
+# Scanned context dirs: path -> (source, dir st_mtime_ns, {filename: st_mtime_ns}, files).
+# A hit needs the dir mtime (adds/removes/renames) and every file's mtime
+# (content edits) to match, so unchanged folders cost stat() calls, not reads.
+_scan_cache: Dict[str, Tuple[str, int, Dict[str, int], Dict[Tuple[str, str], Dict[str, Any]]]] = {}
+
 
 # =============================================================================
 # File Types Management
@@ -37,15 +58,12 @@ CONTEXT_FILES_DIR.mkdir(exist_ok=True)
 
 def get_file_types() -> List[str]:
     """Get the list of file types (creates file if not exists)."""
-    if FILE_TYPES_FILE.exists():
-        try:
-            with open(FILE_TYPES_FILE, "r") as f:
-                return json.load(f)
-        except:
-            pass
-    # Create the file with default types
-    with open(FILE_TYPES_FILE, "w") as f:
-        json.dump(DEFAULT_FILE_TYPES, f, indent=2)
+    try:
+        return orjson.loads(FILE_TYPES_FILE.read_bytes())
+    except (OSError, ValueError):
+        pass
+    # Missing or unreadable - create the file with default types
+    atomic_write_bytes(FILE_TYPES_FILE, orjson.dumps(DEFAULT_FILE_TYPES, option=orjson.OPT_INDENT_2))
     return DEFAULT_FILE_TYPES
 
 
@@ -53,13 +71,188 @@ def get_file_types() -> List[str]:
 # Context Files CRUD
 # =============================================================================
 
-def load_context_files(project_id: str = None) -> List[Dict[str, Any]]:
+def read_file_text(path: str, size: Optional[int] = None) -> str:
+    """
+    Read a whole UTF-8 file, sized from its stat.
+    
+    Small files take one os.read (no buffered/text-mode layers of open());
+    a file that grew since it was stat'd is still read to the end. Files of
+    MMAP_THRESHOLD bytes or more are mapped and decoded straight from the
+    page cache, skipping the intermediate bytes copy. Line endings are
+    normalized to "\n", as text-mode open() does.
+    
+    Args:
+        path: File to read
+        size: File size if already known (e.g. from a scandir entry)
+    
+    Raises:
+        OSError: If the file can't be opened or read
+        UnicodeDecodeError: If the file isn't valid UTF-8
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        if size is None or size >= MMAP_THRESHOLD:
+            # Re-stat before mapping - a file emptied since the caller's stat
+            # can't be mmap'd
+            size = os.fstat(fd).st_size
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mapped:
+                text = str(mapped, "utf-8")
+        else:
+            data = os.read(fd, size + 1)
+            if len(data) > size:
+                chunks = [data]
+                while True:
+                    chunk = os.read(fd, 65536)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                data = b"".join(chunks)
+            text = data.decode()
+    finally:
+        os.close(fd)
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def _parse_context_filename(filename: str) -> Tuple[str, str, str]:
+    """
+    Split "{name}_{type}.md" into (id, name, type); files without a type are pre-llm.
+    
+    The id is "{name}_{type}" - for typed files that is just the stem.
+    """
+    stem = filename[:-3]
+    name, sep, file_type = stem.rpartition("_")
+    if sep:
+        return stem, name, file_type
+    return f"{stem}_pre-llm", stem, "pre-llm"
+
+
+def _list_context_file_metadata(directory: Path = CONTEXT_FILES_DIR) -> List[Dict[str, str]]:
+    """
+    List context files from their filenames alone, without reading content.
+    
+    Uses the same name/type parsing and (name, type) de-duplication as
+    _scan_context_dir, so ids and ordering match load_context_files.
+    
+    Returns:
+        List of dicts with id, name, type and path
+    """
+    files = {}
+    try:
+        entries = os.scandir(directory)
+    except OSError:
+        return []
+    
+    with entries:
+        for entry in entries:
+            if not entry.name.endswith(".md") or not entry.is_file():
+                continue
+            file_id, name, file_type = _parse_context_filename(entry.name)
+            files[(name, file_type)] = {
+                "id": file_id,
+                "name": name,
+                "type": file_type,
+                "path": entry.path
+            }
+    return list(files.values())
+
+
+def _invalidate_scan_cache() -> None:
+    """Forget all scanned context dirs (called after writes and deletes)."""
+    _scan_cache.clear()
+
+
+def _scan_context_dir(directory: Path, source: str) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """
+    Read all .md context files in a directory with a single os.scandir pass.
+    
+    Results are cached until the directory or one of its files changes.
+    The returned dict and its file infos are shared - callers must copy
+    before mutating.
+    
+    Args:
+        directory: Folder to scan
+        source: Value for the "source" field ("global" or "project")
+        
+    Returns:
+        Dict keyed by (name, type) -> file info (without is_default)
+    """
+    key = str(directory)
+    try:
+        dir_mtime = os.stat(key).st_mtime_ns
+    except OSError:
+        _scan_cache.pop(key, None)
+        return {}
+    
+    cached = _scan_cache.get(key)
+    if cached is not None and cached[0] == source and cached[1] == dir_mtime:
+        try:
+            if all(
+                os.stat(os.path.join(key, filename)).st_mtime_ns == mtime
+                for filename, mtime in cached[2].items()
+            ):
+                return cached[3]
+        except OSError:
+            pass
+    
+    file_dict = {}
+    file_mtimes = {}
+    try:
+        entries = os.scandir(directory)
+    except OSError:
+        return file_dict
+    
+    with entries:
+        for entry in entries:
+            if not entry.name.endswith(".md") or not entry.is_file():
+                continue
+            try:
+                st = entry.stat()
+                content = read_file_text(entry.path, st.st_size)
+            except (OSError, UnicodeDecodeError):
+                continue
+            file_mtimes[entry.name] = st.st_mtime_ns
+            file_id, name, file_type = _parse_context_filename(entry.name)
+            
+            file_dict[(name, file_type)] = {
+                "id": file_id,
+                "name": name,
+                "type": file_type,
+                "content": content,
+                "source": source
+            }
+    
+    _scan_cache[key] = (source, dir_mtime, file_mtimes, file_dict)
+    return file_dict
+
+
+def _context_dir_files(directory: Path, source: str, include_content: bool) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """Scan a context dir with content, or list it from filenames with content None."""
+    if include_content:
+        return _scan_context_dir(directory, source)
+    return {
+        (f["name"], f["type"]): {
+            "id": f["id"],
+            "name": f["name"],
+            "type": f["type"],
+            "content": None,
+            "source": source
+        }
+        for f in _list_context_file_metadata(directory)
+    }
+
+
+def load_context_files(project_id: str = None, include_content: bool = True) -> List[Dict[str, Any]]:
     """
     Load context files metadata from folder.
     
     Args:
         project_id: Optional project ID - if provided, loads from both global and project folders
                    (project files override global with same name/type)
+        include_content: If False, files are listed from their names alone and
+                   "content" is None - for callers that only need ids/names/types
         
     Returns:
         Dict with files list and optional notification
@@ -67,37 +260,10 @@ def load_context_files(project_id: str = None) -> List[Dict[str, Any]]:
     # Load defaults
     defaults = load_context_defaults()
     
-    files = []
     notification = None
     
-    file_dict = {}  # key: (name, type) -> file info
-    
     # Always load global context files first (for dropdown selection)
-    for md_file in CONTEXT_FILES_DIR.glob("*.md"):
-        if md_file.name in ("file_types.json", "defaults.json"):
-            continue
-        try:
-            with open(md_file, "r") as f:
-                content = f.read()
-            stem = md_file.stem
-            parts = stem.rsplit("_", 1)
-            if len(parts) == 2:
-                name = parts[0]
-                file_type = parts[1]
-            else:
-                name = stem
-                file_type = "pre-llm"
-            
-            key = (name, file_type)
-            file_dict[key] = {
-                "id": f"{name}_{file_type}",
-                "name": name,
-                "type": file_type,
-                "content": content,
-                "source": "global"
-            }
-        except:
-            pass
+    file_dict = dict(_context_dir_files(CONTEXT_FILES_DIR, "global", include_content))  # key: (name, type) -> file info
     
     # Then load project-specific files (override global ones)
     project_context_exists = False
@@ -106,38 +272,16 @@ def load_context_files(project_id: str = None) -> List[Dict[str, Any]]:
         if len(parts) == 2:
             user_name, project_name = parts
             proj_context_dir = PROJECTS_DIR / user_name / project_name / "proj_context"
-            project_context_exists = proj_context_dir.exists() and any(proj_context_dir.glob("*.md"))
-            
-            if proj_context_dir.exists():
-                for md_file in proj_context_dir.glob("*.md"):
-                    try:
-                        with open(md_file, "r") as f:
-                            content = f.read()
-                        stem = md_file.stem
-                        parts = stem.rsplit("_", 1)
-                        if len(parts) == 2:
-                            name = parts[0]
-                            file_type = parts[1]
-                        else:
-                            name = stem
-                            file_type = "pre-llm"
-                        
-                        key = (name, file_type)
-                        file_dict[key] = {
-                            "id": f"{name}_{file_type}",
-                            "name": name,
-                            "type": file_type,
-                            "content": content,
-                            "source": "project"
-                        }
-                    except:
-                        pass
-    
-    # Convert dict to list and add is_default
-    for key, file_info in file_dict.items():
-        name, file_type = key
-        file_info["is_default"] = defaults.get(file_type) == name
-        files.append(file_info)
+            project_files = _context_dir_files(proj_context_dir, "project", include_content)
+            project_context_exists = bool(project_files)
+            file_dict.update(project_files)
+    
+    # Convert dict to list and add is_default (on copies - scans are cached)
+    defaults_get = defaults.get
+    files = [
+        {**file_info, "is_default": defaults_get(file_type) == name}
+        for (name, file_type), file_info in file_dict.items()
+    ]
     
     # Add notification if project context folder doesn't exist but was requested
     if project_id and not project_context_exists:
@@ -164,7 +308,6 @@ def load_project_only_context_files(project_id: str) -> List[Dict[str, Any]]:
         return []
     
     defaults = load_context_defaults()
-    files = []
     file_dict = {}
     
     parts = project_id.split('-', 1)
@@ -172,37 +315,15 @@ def load_project_only_context_files(project_id: str) -> List[Dict[str, Any]]:
         user_name, project_name = parts
         proj_context_dir = PROJECTS_DIR / user_name / project_name / "proj_context"
         
-        if proj_context_dir.exists() and any(proj_context_dir.glob("*.md")):
-            # Only load from project folder - NO global fallback
-            for md_file in proj_context_dir.glob("*.md"):
-                try:
-                    with open(md_file, "r") as f:
-                        content = f.read()
-                    stem = md_file.stem
-                    parts = stem.rsplit("_", 1)
-                    if len(parts) == 2:
-                        name = parts[0]
-                        file_type = parts[1]
-                    else:
-                        name = stem
-                        file_type = "pre-llm"
-                    
-                    key = (name, file_type)
-                    file_dict[key] = {
-                        "id": f"{name}_{file_type}",
-                        "name": name,
-                        "type": file_type,
-                        "content": content,
-                        "source": "project"
-                    }
-                except:
-                    pass
-    
-    # Convert dict to list
-    for key, file_info in file_dict.items():
-        name, file_type = key
-        file_info["is_default"] = defaults.get(file_type) == name
-        files.append(file_info)
+        # Only load from project folder - NO global fallback
+        file_dict = _scan_context_dir(proj_context_dir, "project")
+    
+    # Convert dict to list (copies - scans are cached)
+    defaults_get = defaults.get
+    files = [
+        {**file_info, "is_default": defaults_get(file_type) == name}
+        for (name, file_type), file_info in file_dict.items()
+    ]
     
     return files
 
@@ -222,9 +343,6 @@ def save_context_file(file_id: str, file_type: str, name: str, content: str, pro
     Returns:
         Dict with success status and notification message
     """
-    import logging
-    logger = logging.getLogger(__name__)
-    
     # Determine target directory
     target_dir = CONTEXT_FILES_DIR
     was_created = False
@@ -249,14 +367,17 @@ def save_context_file(file_id: str, file_type: str, name: str, content: str, pro
             # Clear ALL existing .md files in proj_context before saving (replace all files)
             # Only clear if clear_existing is True (to allow batch saving multiple files)
             if clear_existing:
-                for md_file in target_dir.glob("*.md"):
-                    logger.info(f"[CONTEXT FILES SERVICE] Clearing old file: {md_file}")
-                    md_file.unlink()
+                with os.scandir(target_dir) as entries:
+                    for entry in entries:
+                        if entry.name.endswith(".md"):
+                            logger.info(f"[CONTEXT FILES SERVICE] Clearing old file: {entry.path}")
+                            os.unlink(entry.path)
+                _invalidate_scan_cache()
             
             logger.info(f"[CONTEXT FILES SERVICE] Saving to project folder: project_id={project_id}, dir={target_dir}, clear_existing={clear_existing}")
     
     # Sanitize name for filename - REMOVE any type suffix if present
-    safe_name = "".join(c for c in name if c.isalnum() or c in "-_").strip()
+    safe_name = _UNSAFE_NAME_RE.sub("", name)
     if not safe_name:
         safe_name = "untitled"
     
@@ -271,8 +392,8 @@ def save_context_file(file_id: str, file_type: str, name: str, content: str, pro
     
     logger.info(f"[CONTEXT FILES SERVICE] Saving file: file_id={file_id}, name={name}, type={file_type}, filepath={filepath}")
     
-    with open(filepath, "w") as f:
-        f.write(content)
+    atomic_write_bytes(filepath, content.encode())
+    _invalidate_scan_cache()
     
     return {
         "success": True,
@@ -291,11 +412,16 @@ def delete_context_file(file_id: str) -> bool:
     Returns:
         True if deleted, False if not found
     """
-    for md_file in CONTEXT_FILES_DIR.glob("*.md"):
-        if md_file.stem == file_id:
-            md_file.unlink()
-            return True
-    return False
+    # The only file whose stem equals file_id is {file_id}.md - unlink it
+    # directly instead of listing the folder (ids never contain a path separator)
+    if not file_id or "/" in file_id or os.sep in file_id:
+        return False
+    try:
+        os.unlink(CONTEXT_FILES_DIR / f"{file_id}.md")
+    except FileNotFoundError:
+        return False
+    _invalidate_scan_cache()
+    return True
 
 
 # =============================================================================
@@ -305,13 +431,10 @@ def delete_context_file(file_id: str) -> bool:
 def load_context_defaults() -> Dict[str, str]:
     """Load default context file mappings from defaults.json."""
     defaults_file = CONTEXT_FILES_DIR / "defaults.json"
-    if defaults_file.exists():
-        try:
-            with open(defaults_file, "r") as f:
-                return json.load(f)
-        except:
-            pass
-    return {}
+    try:
+        return orjson.loads(defaults_file.read_bytes())
+    except (OSError, ValueError):
+        return {}
 
 
 def save_context_defaults(defaults: Dict[str, str]) -> None:
@@ -322,8 +445,7 @@ def save_context_defaults(defaults: Dict[str, str]) -> None:
         defaults: Dict mapping file types to default file names
     """
     defaults_file = CONTEXT_FILES_DIR / "defaults.json"
-    with open(defaults_file, "w") as f:
-        json.dump(defaults, f, indent=2)
+    atomic_write_bytes(defaults_file, orjson.dumps(defaults, option=orjson.OPT_INDENT_2))
 
 
 def set_context_file_default(file_id: str) -> Dict[str, str]:
@@ -336,27 +458,13 @@ def set_context_file_default(file_id: str) -> Dict[str, str]:
     Returns:
         Dict with status, type, and name
     """
-    import logging
-    logger = logging.getLogger(__name__)
-    
-    result = load_context_files()
     logger.info(f"[CONTEXT FILES] set_context_file_default called with file_id={file_id}")
-    logger.info(f"[CONTEXT FILES] load_context_files returned type: {type(result)}, keys: {result.keys() if isinstance(result, dict) else 'N/A'}")
-    
-    # Fix: Handle the dict return format
-    if isinstance(result, dict):
-        files_list = result.get("files", [])
-    else:
-        files_list = result
     
-    logger.info(f"[CONTEXT FILES] Files list type: {type(files_list)}, length: {len(files_list) if isinstance(files_list, list) else 'N/A'}")
-    
-    # Find the file
-    target_file = None
-    for f in files_list:
-        if f["id"] == file_id:
-            target_file = f
-            break
+    # Only the name/type are needed - parse them from filenames, no content reads
+    target_file = next(
+        (f for f in _list_context_file_metadata() if f["id"] == file_id),
+        None
+    )
     
     if not target_file:
         raise FileNotFoundError(f"File not found: {file_id}")
@@ -379,35 +487,44 @@ def get_pre_llm_context() -> Optional[Dict[str, Any]]:
     Get the default pre-llm context file content.
     This ensures the pre-llm instructions are always included in LLM calls.
     
+    Candidates are picked from filenames alone; only the chosen file is read.
+    
     Returns:
         Dict with pre-llm context file data, or None if not found
     """
-    result = load_context_files()
-    # Handle dict return format
-    if isinstance(result, dict):
-        files = result.get("files", [])
-    else:
-        files = result
-    
+    files = _list_context_file_metadata()
     defaults = load_context_defaults()
     
     # Get the default pre-llm file name from defaults
     default_pre_llm_name = defaults.get("pre-llm")
     
+    candidates = []
     # First try to find the default pre-llm file by name from defaults
     if default_pre_llm_name:
-        for f in files:
-            if f.get("name") == default_pre_llm_name and f.get("type") == "pre-llm":
-                return f
-    
-    # Fallback: look for any file with type "pre-llm" or filename containing "pre-llm"
-    for f in files:
-        if f.get("type") == "pre-llm":
-            return f
-        # Also check if filename contains "pre-llm"
-        file_id = f.get("id", "")
-        if "pre-llm" in file_id.lower():
-            return f
+        candidates.extend(
+            f for f in files
+            if f["name"] == default_pre_llm_name and f["type"] == "pre-llm"
+        )
+    # Fallback: any file with type "pre-llm" or filename containing "pre-llm"
+    candidates.extend(
+        f for f in files
+        if f["type"] == "pre-llm" or "pre-llm" in f["id"].lower()
+    )
+    
+    # Unreadable files are skipped, same as load_context_files
+    for f in candidates:
+        try:
+            content = read_file_text(f["path"])
+        except (OSError, UnicodeDecodeError):
+            continue
+        return {
+            "id": f["id"],
+            "name": f["name"],
+            "type": f["type"],
+            "content": content,
+            "source": "global",
+            "is_default": defaults.get(f["type"]) == f["name"]
+        }
     
     return None
 
@@ -422,7 +539,6 @@ def load_project_context_settings(project_id: str) -> Dict[str, str]:
     Returns:
         Dict of context settings for the project
     """
-    from services.config import load_config, save_config
     config = load_config()
     return config.get("project_context_settings", {}).get(project_id, {})
 
@@ -435,12 +551,8 @@ def save_project_context_settings(project_id: str, settings: Dict[str, str]) ->
         project_id: The project identifier
         settings: Dict of context settings
     """
-    from services.config import load_config, save_config
-    config = load_config()
-    if "project_context_settings" not in config:
-        config["project_context_settings"] = {}
-    config["project_context_settings"][project_id] = settings
-    save_config(config)
+    with config_transaction() as config:
+        config.setdefault("project_context_settings", {})[project_id] = settings
 
 
 # =============================================================================
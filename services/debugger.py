@@ -3,35 +3,102 @@ Debugger Service
 Handles error analysis and debugging with debugger.md context.
 """
 import json
-from pathlib import Path
-from typing import List, Dict, Any, Optional
+import os
+import re
+from typing import List, Dict, Any, Optional, Tuple
 from services.code_stripper import extract_code_blocks
+from services.context_files import CONTEXT_FILES_DIR, read_file_text
+
+
+# Resolved debugger context - (dir st_mtime_ns, path, file st_mtime_ns, content)
+# or None. Reused while neither the directory nor the chosen file changes
+_debugger_cache: Optional[Tuple[int, Optional[str], Optional[int], Optional[str]]] = None
 
 
 def get_debugger_context() -> str:
-    """Load the debugger.md context file if it exists."""
-    context_files_dir = Path(__file__).parent.parent / "context_files"
+    """Load the debugger.md context file if it exists (cached until it changes)."""
+    global _debugger_cache
     
-    # Look for any debugger type file
-    for md_file in context_files_dir.glob("*_debugger_*.md"):
+    try:
+        dir_mtime = os.stat(CONTEXT_FILES_DIR).st_mtime_ns
+    except OSError:
+        _debugger_cache = None
+        return None
+    
+    cached = _debugger_cache
+    if cached is not None and cached[0] == dir_mtime:
+        if cached[1] is None:
+            return None
         try:
-            with open(md_file, 'r') as f:
-                return f.read()
-        except:
+            if os.stat(cached[1]).st_mtime_ns == cached[2]:
+                return cached[3]
+        except OSError:
             pass
     
-    # Also check for any file with type=debugger
-    for md_file in context_files_dir.glob("*.md"):
-        if "debugger" in md_file.name:
-            try:
-                with open(md_file, 'r') as f:
-                    return f.read()
-            except:
-                pass
+    # One scandir pass, ranking candidates: a debugger type file
+    # (*_debugger_*.md) first, then any .md with "debugger" in its name
+    typed_files = []
+    named_files = []
+    try:
+        with os.scandir(CONTEXT_FILES_DIR) as entries:
+            for entry in entries:
+                name = entry.name
+                if not name.endswith(".md") or "debugger" not in name:
+                    continue
+                if "_debugger_" in name:
+                    typed_files.append(entry)
+                else:
+                    named_files.append(entry)
+    except OSError:
+        return None
     
+    for entry in typed_files + named_files:
+        try:
+            st = entry.stat()
+            content = read_file_text(entry.path, st.st_size)
+        except (OSError, UnicodeDecodeError):
+            continue
+        _debugger_cache = (dir_mtime, entry.path, st.st_mtime_ns, content)
+        return content
+    
+    _debugger_cache = (dir_mtime, None, None, None)
     return None
 
 
+# Common Python error patterns, in priority order: when several appear in the
+# output, the earliest type in this tuple wins
+_ERROR_TYPES = (
+    "ImportError",
+    "ModuleNotFoundError",
+    "SyntaxError",
+    "NameError",
+    "TypeError",
+    "ValueError",
+    "FileNotFoundError",
+    "PermissionError",
+    "TimeoutError",
+    "ConnectionError",
+)
+_ERROR_PRIORITY = {error_type: i for i, error_type in enumerate(_ERROR_TYPES)}
+
+# All patterns fused into one alternation so the output is scanned once. Only
+# the "XError: " prefix is consumed - the message is captured in a lookahead,
+# so a match never hides another error type later on the same line
+_ERROR_RE = re.compile("|".join([
+    r"(?P<ImportError>ImportError: (?=(?P<ImportError_msg>.+)))",
+    r"(?P<ModuleNotFoundError>ModuleNotFoundError: (?=No module named '(?P<ModuleNotFoundError_msg>.+)'))",
+    r"(?P<SyntaxError>SyntaxError: (?=(?P<SyntaxError_msg>.+)))",
+    r"(?P<NameError>NameError: (?=name '(?P<NameError_msg>.+)' is not defined))",
+    r"(?P<TypeError>TypeError: (?=(?P<TypeError_msg>.+)))",
+    r"(?P<ValueError>ValueError: (?=(?P<ValueError_msg>.+)))",
+    r"(?P<FileNotFoundError>FileNotFoundError: (?=(?P<FileNotFoundError_msg>.+)))",
+    r"(?P<PermissionError>PermissionError: (?=(?P<PermissionError_msg>.+)))",
+    r"(?P<TimeoutError>TimeoutError: (?=(?P<TimeoutError_msg>.+)))",
+    r"(?P<ConnectionError>ConnectionError: (?=(?P<ConnectionError_msg>.+)))",
+]))
+_LINE_RE = re.compile(r"line (\d+)")
+
+
 def analyze_error(error_output: str) -> Dict[str, Any]:
     """
     Analyze an error output to extract useful debugging information.
@@ -46,60 +113,52 @@ def analyze_error(error_output: str) -> Dict[str, Any]:
         "suggested_fixes": []
     }
     
-    # Common Python error patterns
-    error_patterns = {
-        "ImportError": r"ImportError: (.+)",
-        "ModuleNotFoundError": r"ModuleNotFoundError: No module named '(.+)'",
-        "SyntaxError": r"SyntaxError: (.+)",
-        "NameError": r"NameError: name '(.+)' is not defined",
-        "TypeError": r"TypeError: (.+)",
-        "ValueError": r"ValueError: (.+)",
-        "FileNotFoundError": r"FileNotFoundError: (.+)",
-        "PermissionError": r"PermissionError: (.+)",
-        "TimeoutError": r"TimeoutError: (.+)",
-        "ConnectionError": r"ConnectionError: (.+)",
-    }
+    # Pick the highest-priority error type present (first occurrence of it)
+    best = None
+    best_priority = len(_ERROR_TYPES)
+    for match in _ERROR_RE.finditer(error_output):
+        priority = _ERROR_PRIORITY[match.lastgroup]
+        if priority < best_priority:
+            best, best_priority = match, priority
+            if priority == 0:
+                break
     
-    for error_type, pattern in error_patterns.items():
-        import re
-        match = re.search(pattern, error_output)
-        if match:
-            error_info["error_type"] = error_type
-            error_info["error_message"] = match.group(1)
-            
-            # Try to extract line number
-            line_match = re.search(r"line (\d+)", error_output)
-            if line_match:
-                error_info["line_number"] = int(line_match.group(1))
-            
-            # Add suggested fixes based on error type
-            if error_type == "ModuleNotFoundError":
-                module_name = match.group(1)
-                error_info["suggested_fixes"] = [
-                    f"Install the module: pip install {module_name}",
-                    f"Add {module_name} to requirements.txt",
-                    f"Check if the module name is correct"
-                ]
-            elif error_type == "SyntaxError":
-                error_info["suggested_fixes"] = [
-                    "Check for missing parentheses, brackets, or quotes",
-                    "Verify indentation is correct",
-                    "Ensure all strings are properly closed"
-                ]
-            elif error_type == "NameError":
-                error_info["suggested_fixes"] = [
-                    "Check if the variable is defined before use",
-                    "Verify there are no typos in variable names",
-                    "Make sure imports are correct"
-                ]
-            elif error_type == "TypeError":
-                error_info["suggested_fixes"] = [
-                    "Check the types of variables being used",
-                    "Verify function arguments are correct",
-                    "Ensure you're not mixing incompatible types"
-                ]
-            
-            break
+    if best is not None:
+        error_type = best.lastgroup
+        error_info["error_type"] = error_type
+        error_info["error_message"] = best.group(error_type + "_msg")
+        
+        # Try to extract line number
+        line_match = _LINE_RE.search(error_output)
+        if line_match:
+            error_info["line_number"] = int(line_match.group(1))
+        
+        # Add suggested fixes based on error type
+        if error_type == "ModuleNotFoundError":
+            module_name = error_info["error_message"]
+            error_info["suggested_fixes"] = [
+                f"Install the module: pip install {module_name}",
+                f"Add {module_name} to requirements.txt",
+                f"Check if the module name is correct"
+            ]
+        elif error_type == "SyntaxError":
+            error_info["suggested_fixes"] = [
+                "Check for missing parentheses, brackets, or quotes",
+                "Verify indentation is correct",
+                "Ensure all strings are properly closed"
+            ]
+        elif error_type == "NameError":
+            error_info["suggested_fixes"] = [
+                "Check if the variable is defined before use",
+                "Verify there are no typos in variable names",
+                "Make sure imports are correct"
+            ]
+        elif error_type == "TypeError":
+            error_info["suggested_fixes"] = [
+                "Check the types of variables being used",
+                "Verify function arguments are correct",
+                "Ensure you're not mixing incompatible types"
+            ]
     
     return error_info
 
@@ -116,33 +175,27 @@ def create_debug_prompt(error: str, debugger_context: Optional[str] = None) -> s
         A prompt string to send to the LLM for debugging
     """
     error_info = analyze_error(error)
+    line_number = error_info['line_number']
+    fixes = error_info['suggested_fixes']
     
-    prompt_parts = [
-        "I'm encountering an error while running code. Please help me debug it.",
-        "",
-        f"Error Type: {error_info['error_type']}",
-        f"Error Message: {error_info['error_message']}",
-    ]
-    
-    if error_info['line_number']:
-        prompt_parts.append(f"Error Line: {error_info['line_number']}")
-    
-    if error_info['suggested_fixes']:
-        prompt_parts.append("")
-        prompt_parts.append("Suggested fixes to try:")
-        for fix in error_info['suggested_fixes']:
-            prompt_parts.append(f"- {fix}")
-    
-    if debugger_context:
-        prompt_parts.append("")
-        prompt_parts.append("Debug Context:")
-        prompt_parts.append(debugger_context)
-    
-    prompt_parts.append("")
-    prompt_parts.append("Please analyze the error and provide corrected code that fixes the issue.")
-    prompt_parts.append("Respond with only the corrected code in a code block. Do not include explanations unless the code cannot be fixed.")
+    # Optional sections are spliced in whole, each with its leading newline
+    line_section = f"\nError Line: {line_number}" if line_number else ""
+    fixes_section = (
+        "\n\nSuggested fixes to try:\n" + "\n".join(f"- {fix}" for fix in fixes)
+        if fixes else ""
+    )
+    context_section = f"\n\nDebug Context:\n{debugger_context}" if debugger_context else ""
     
-    return "\n".join(prompt_parts)
+    return (
+        "I'm encountering an error while running code. Please help me debug it.\n"
+        "\n"
+        f"Error Type: {error_info['error_type']}\n"
+        f"Error Message: {error_info['error_message']}"
+        f"{line_section}{fixes_section}{context_section}\n"
+        "\n"
+        "Please analyze the error and provide corrected code that fixes the issue.\n"
+        "Respond with only the corrected code in a code block. Do not include explanations unless the code cannot be fixed."
+    )
 
 
 def debug_error(
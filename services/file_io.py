@@ -0,0 +1,57 @@
+"""
+File I/O Utilities
+Small helpers shared by the services that persist state to disk.
+"""
+import os
+import threading
+from pathlib import Path
+from typing import Union
+
+
+def atomic_write_bytes(path: Union[str, Path], data: bytes) -> None:
+    """
+    Replace a file's contents atomically.
+
+    The data goes to a temp file in the same directory, which is fsync'd and
+    then os.replace'd over the target, so readers (and a crash mid-write) see
+    either the old file or the new one - never a truncated mix. Like writing
+    the file in place, it keeps the file's permission bits (config.json may
+    hold API keys at 0600) and writes through a symlink to its target.
+
+    Args:
+        path: File to write
+        data: Full new contents
+    """
+    path = os.path.realpath(os.fspath(path))
+    directory, name = os.path.split(path)
+    try:
+        mode = os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        mode = None  # New file - 0o644 less the umask, as open() would give
+    # Unique per writer, hidden, and not *.md/*.json so directory scans skip it
+    tmp_path = os.path.join(
+        directory, f".{name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    )
+    fd = os.open(
+        tmp_path,
+        os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+        0o644 if mode is None else mode
+    )
+    try:
+        try:
+            if mode is not None:
+                # os.open's mode is masked by the umask - set the old bits exactly
+                os.fchmod(fd, mode)
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -1,9 +1,24 @@
 """
 LLM Providers Service
 Handles setup and calling of different LLM providers (MiniMax, OpenAI).
+
+Tuning (environment variables, read at import):
+- AELILOBSTER_HTTPX_MAX_CONNS: connection pool size of the shared client (default 256)
+- AELILOBSTER_HTTPX_KEEPALIVE: idle keep-alive connections kept open (default 64)
+- PROXY_CONCURRENCY: max in-flight upstream LLM requests (default 32)
 """
+import asyncio
+import contextlib
+import functools
+import json
+import logging
+import os
+import weakref
 import httpx
-from typing import List, Dict, Any, Callable, Optional
+import orjson
+from typing import List, Dict, Any, AsyncIterator, Callable, Optional
+
+logger = logging.getLogger(__name__)
 
 # MiniMax 2.5 Anthropic-compatible endpoint
 MINIMAX_ANTHROPIC_ENDPOINT = "https://api.minimax.io/anthropic/v1/messages"
@@ -12,11 +27,161 @@ MINIMAX_ENDPOINT = "https://api.minimax.io/v1/text/chatcompletion_v2"
 # OpenAI endpoint
 OPENAI_ENDPOINT = "https://api.openai.com/v1/chat/completions"
 
+# Route templates (provider + endpoint) - only the auth header varies per call
+_MINIMAX_ANTHROPIC_ROUTE = {"provider": "minimax_anthropic", "endpoint": MINIMAX_ANTHROPIC_ENDPOINT}
+_MINIMAX_ROUTE = {"provider": "minimax", "endpoint": MINIMAX_ENDPOINT}
+_OPENAI_ROUTE = {"provider": "openai", "endpoint": OPENAI_ENDPOINT}
+
+# Anthropic-format requests mark their trailing system blocks as prompt-cache
+# breakpoints (the API allows at most 4); pre-llm context leads every request
+# unchanged, so repeat calls reuse the cached prefix instead of re-reading it
+_CACHE_CONTROL = {"type": "ephemeral"}
+MAX_CACHE_BREAKPOINTS = 4
+
+# Shared HTTP client per event loop - created on first use so its connection
+# pool (and the TLS sessions in it) is reused across every LLM request. httpx
+# connections belong to the loop that opened them, so a script that calls
+# asyncio.run() repeatedly gets a fresh pool per loop instead of one bound to a
+# closed loop; weak keys let a finished loop's entry go away with it
+_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+# Pool sizing - raise these when running many concurrent loopers
+HTTPX_MAX_CONNECTIONS = max(1, int(os.getenv("AELILOBSTER_HTTPX_MAX_CONNS", "256")))
+HTTPX_MAX_KEEPALIVE = max(0, int(os.getenv("AELILOBSTER_HTTPX_KEEPALIVE", "64")))
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the running loop's shared AsyncClient, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    client = _http_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=60.0,
+            limits=httpx.Limits(
+                max_keepalive_connections=HTTPX_MAX_KEEPALIVE,
+                max_connections=HTTPX_MAX_CONNECTIONS,
+                keepalive_expiry=30.0
+            )
+        )
+        _http_clients[loop] = client
+    return client
+
+
+async def close_http_client() -> None:
+    """Close the running loop's shared AsyncClient (called on app shutdown)."""
+    client = _http_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+# Upstream admission control - caps in-flight LLM requests so bursts queue
+# here instead of opening unbounded sockets and tripping provider rate limits.
+# A Condition + counter is used rather than a Semaphore so the cap can be resized.
+# Like the HTTP client, the state is per event loop: an asyncio.Condition binds
+# to the first loop that waits on it
+_max_concurrency = max(1, int(os.getenv("PROXY_CONCURRENCY", "32")))
+
+
+class _Admission:
+    """One loop's admission state: its Condition and the slots held on it."""
+    
+    __slots__ = ("cv", "active")
+    
+    def __init__(self):
+        self.cv = asyncio.Condition()
+        self.active = 0
+
+
+_admissions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _Admission]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _loop_admission() -> _Admission:
+    """Return the running loop's admission state, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    admission = _admissions.get(loop)
+    if admission is None:
+        # A Condition that was waited on references its loop, so weak keys
+        # alone never drop a finished loop's entry - prune closed loops here
+        for stale in [other for other in _admissions if other.is_closed()]:
+            del _admissions[stale]
+        admission = _admissions[loop] = _Admission()
+    return admission
+
+
+async def set_max_concurrency(limit: int) -> None:
+    """Resize the upstream concurrency cap, waking waiters if it grew."""
+    global _max_concurrency
+    admission = _loop_admission()
+    async with admission.cv:
+        _max_concurrency = max(1, limit)
+        admission.cv.notify_all()
+
+
+@contextlib.asynccontextmanager
+async def _admitted():
+    """Hold one upstream request slot for the duration of the block."""
+    admission = _loop_admission()
+    async with admission.cv:
+        await admission.cv.wait_for(lambda: admission.active < _max_concurrency)
+        admission.active += 1
+    try:
+        yield
+    finally:
+        async with admission.cv:
+            admission.active -= 1
+            admission.cv.notify(1)
+
+
+@functools.lru_cache(maxsize=256)
+def _route(model: str) -> Dict[str, str]:
+    """
+    Resolve a model name to its route template (cached per model string).
+    
+    The returned dict is shared - callers must copy it before mutating.
+    """
+    model_lower = model.lower()
+    
+    # MiniMax models
+    if "minimax" in model_lower:
+        # MiniMax 2.5 uses the Anthropic-compatible endpoint,
+        # older MiniMax models use the OpenAI-compatible one
+        if "2.5" in model_lower or "m2.5" in model_lower:
+            return _MINIMAX_ANTHROPIC_ROUTE
+        return _MINIMAX_ROUTE
+    
+    # OpenAI models
+    return _OPENAI_ROUTE
+
+
+@functools.lru_cache(maxsize=8)
+def _auth_headers(api_key: str) -> Dict[str, str]:
+    """
+    Build request headers for an API key (cached - a deployment uses a handful of keys).
+    
+    The returned dict is shared - callers must copy it before mutating.
+    """
+    return {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+
 
+def is_minimax_model(model: str) -> bool:
+    """Check whether a model is served by MiniMax (either endpoint)."""
+    return _route(model)["provider"].startswith("minimax")
+
+
+@functools.lru_cache(maxsize=64)
 def get_provider_and_headers(model: str, api_key: str) -> Dict[str, Any]:
     """
     Determine the provider and set up headers based on the model.
     
+    Cached per (model, api_key) - the returned dict is shared, so callers
+    must copy it before mutating.
+    
     Args:
         model: The model name (e.g., "MiniMax-M2.5", "gpt-4")
         api_key: The API key for authentication
@@ -24,88 +189,46 @@ def get_provider_and_headers(model: str, api_key: str) -> Dict[str, Any]:
     Returns:
         Dict with provider, api_key, endpoint, and headers
     """
-    model_lower = model.lower()
-    
-    # MiniMax models
-    if "minimax" in model_lower:
-        # Check if it's MiniMax 2.5
-        if "2.5" in model_lower or "m2.5" in model_lower:
-            # Use Anthropic-compatible endpoint for MiniMax 2.5
-            return {
-                "provider": "minimax_anthropic",
-                "api_key": api_key,
-                "endpoint": MINIMAX_ANTHROPIC_ENDPOINT,
-                "headers": {
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json"
-                }
-            }
-        else:
-            # Use OpenAI-compatible endpoint for older MiniMax models
-            return {
-                "provider": "minimax",
-                "api_key": api_key,
-                "endpoint": MINIMAX_ENDPOINT,
-                "headers": {
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json"
-                }
-            }
-    
-    # OpenAI models
     return {
-        "provider": "openai",
+        **_route(model),
         "api_key": api_key,
-        "endpoint": OPENAI_ENDPOINT,
-        "headers": {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
+        "headers": _auth_headers(api_key)
     }
 
 
-async def call_minimax_anthropic(
+def _build_anthropic_payload(
     model: str,
     messages: List[Dict[str, str]],
     temperature: float,
-    max_tokens: int,
-    api_key: str
+    max_tokens: int
 ) -> Dict[str, Any]:
     """
-    Call MiniMax 2.5 using Anthropic-compatible endpoint.
+    Build the Anthropic-format payload, hoisting system messages out of the list.
     
-    Args:
-        model: The model name
-        messages: List of message dicts with role and content
-        temperature: Sampling temperature
-        max_tokens: Max tokens to generate
-        api_key: API key for authentication
-    
-    Returns:
-        Response dict in OpenAI format
+    Each system message becomes its own text block so the last few can carry
+    cache_control breakpoints - a request that changes only a later block
+    (e.g. the debugger context) still hits the cache for the blocks before it.
     """
-    # Debug: log the model being used
-    print(f"[DEBUG] MiniMax model: {model}")
-    
     # Use model as-is (user specifies the correct model name)
     api_model = model
     
-    # Extract system messages and combine them
-    system_content = ""
+    # Single pass: collect system messages, wrap the rest in Anthropic format
+    system_blocks = []
     user_messages = []
+    append_system = system_blocks.append
+    append_user = user_messages.append
     
     for msg in messages:
-        if msg.get("role") == "system":
-            # Combine all system messages
-            if system_content:
-                system_content += "\n\n"
-            system_content += msg.get("content", "")
+        role = msg.get("role")
+        content = msg.get("content", "")
+        if role == "system":
+            if content:
+                append_system({"type": "text", "text": content})
         else:
-            # For user messages, wrap content in the required format
-            user_messages.append({
-                "role": msg["role"],
-                "content": [{"type": "text", "text": msg["content"]}]
-            })
+            append_user({"role": role, "content": [{"type": "text", "text": content}]})
+    
+    for block in system_blocks[-MAX_CACHE_BREAKPOINTS:]:
+        block["cache_control"] = _CACHE_CONTROL
     
     payload = {
         "model": api_model,
@@ -114,57 +237,103 @@ async def call_minimax_anthropic(
     }
     
     # Add system if present
-    if system_content:
-        payload["system"] = system_content
+    if system_blocks:
+        payload["system"] = system_blocks
     
     # Add messages
     if user_messages:
         payload["messages"] = user_messages
     
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
+    return payload
+
+
+async def _anthropic_events(
+    payload: Dict[str, Any],
+    headers: Dict[str, str]
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    POST a streaming request to the Anthropic-compatible endpoint and yield
+    its parsed SSE events, up to message_stop.
     
-    # Debug: log the full payload
-    import json
-    print(f"[DEBUG] MiniMax payload: {json.dumps(payload)}")
-    
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                MINIMAX_ANTHROPIC_ENDPOINT,
-                json=payload,
-                headers=headers,
-                timeout=60.0
-            )
-            if response.status_code != 200:
-                error_detail = response.text
-                raise Exception(f"MiniMax API error {response.status_code}: {error_detail}")
-            result = response.json()
-        except httpx.HTTPStatusError as e:
-            raise Exception(f"MiniMax API error: {e.response.status_code} - {e.response.text}")
-        
-        # Parse Anthropic response format
-        content_blocks = result.get("content", [])
-        response_text = ""
-        thinking_text = ""
-        
-        for block in content_blocks:
-            if block.get("type") == "text":
-                response_text += block.get("text", "")
-            elif block.get("type") == "thinking":
-                thinking_text += block.get("thinking", "")
+    Non-200 responses raise with the upstream error body.
+    """
+    client = get_http_client()
+    async with _admitted(), client.stream(
+        "POST",
+        MINIMAX_ANTHROPIC_ENDPOINT,
+        content=orjson.dumps(payload),
+        headers=headers,
+        timeout=60.0
+    ) as response:
+        if response.status_code != 200:
+            error_detail = (await response.aread()).decode(errors="replace")
+            raise Exception(f"MiniMax API error {response.status_code}: {error_detail}")
         
-        return {
-            "choices": [{
-                "message": {
-                    "role": "assistant",
-                    "content": response_text
-                },
-                "finish_reason": "stop"
-            }]
-        }
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            try:
+                event = orjson.loads(line[5:])
+            except ValueError:
+                continue
+            if event.get("type") == "message_stop":
+                return
+            yield event
+
+
+async def call_minimax_anthropic(
+    model: str,
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+    api_key: str
+) -> Dict[str, Any]:
+    """
+    Call MiniMax 2.5 using Anthropic-compatible endpoint.
+    
+    Args:
+        model: The model name
+        messages: List of message dicts with role and content
+        temperature: Sampling temperature
+        max_tokens: Max tokens to generate
+        api_key: API key for authentication
+    
+    Returns:
+        Response dict in OpenAI format
+    """
+    logger.debug("MiniMax model: %s", model)
+    
+    payload = _build_anthropic_payload(model, messages, temperature, max_tokens)
+    
+    headers = _auth_headers(api_key)
+    
+    # Lazy %-formatting: the payload is only rendered when DEBUG is enabled
+    logger.debug("MiniMax payload: %s", payload)
+    
+    # Streamed even though the caller wants the whole reply: a buffered reply
+    # sends nothing until generation ends, so long answers could hit the 60s
+    # read timeout - events keep the connection busy, and text is joined once
+    payload["stream"] = True
+    text_parts = []
+    async for event in _anthropic_events(payload, headers):
+        event_type = event.get("type")
+        if event_type == "content_block_delta":
+            delta = event.get("delta", {})
+            # Only text is returned - thinking deltas are dropped
+            if delta.get("type") == "text_delta":
+                text_parts.append(delta.get("text", ""))
+        elif event_type == "error":
+            raise Exception(f"MiniMax API error: {event.get('error')}")
+    
+    return {
+        "choices": [{
+            "message": {
+                "role": "assistant",
+                "content": "".join(text_parts)
+            },
+            "finish_reason": "stop"
+        }]
+    }
 
 
 async def call_openai_compatible(
@@ -196,15 +365,176 @@ async def call_openai_compatible(
         "max_tokens": max_tokens
     }
     
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
+    headers = _auth_headers(api_key)
+    
+    client = get_http_client()
+    async with _admitted():
+        response = await client.post(endpoint, content=orjson.dumps(payload), headers=headers, timeout=60.0)
+    response.raise_for_status()
+    return orjson.loads(response.content)
+
+
+async def send_openai_compatible(
+    model: str,
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+    endpoint: str,
+    api_key: str
+) -> httpx.Response:
+    """
+    Send a non-streaming OpenAI-compatible request without reading the body.
+    
+    The upstream body is already in the OpenAI format clients expect, so a
+    proxy can relay its bytes instead of parsing and re-encoding them.
+    The caller must close the returned response.
+    
+    The admission slot is held until the response headers arrive - a
+    non-streaming upstream only sends them once generation is finished.
+    
+    Returns:
+        The upstream response with its body still unread
+    """
+    payload = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens
+    }
+    
+    client = get_http_client()
+    request = client.build_request(
+        "POST", endpoint, content=orjson.dumps(payload), headers=_auth_headers(api_key), timeout=60.0
+    )
+    async with _admitted():
+        return await client.send(request, stream=True)
+
+
+# =============================================================================
+# Streaming
+# =============================================================================
+
+def _sse_chunk(
+    content: Optional[str],
+    finish_reason: Optional[str] = None,
+    usage: Optional[Dict[str, int]] = None
+) -> str:
+    """Format a text delta as an OpenAI-style chat.completion.chunk SSE event."""
+    delta = {"content": content} if content is not None else {}
+    chunk = {
+        "object": "chat.completion.chunk",
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
     }
+    if usage is not None:
+        chunk["usage"] = usage
+    return f"data: {json.dumps(chunk)}\n\n"
+
+
+async def stream_minimax_anthropic(
+    model: str,
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+    api_key: str
+) -> AsyncIterator[str]:
+    """
+    Stream MiniMax 2.5 output from the Anthropic-compatible endpoint.
+    
+    Anthropic text deltas are re-emitted as OpenAI-style SSE chunks so
+    clients only need to understand one streaming format. Token counts from
+    message_start/message_delta are reported as "usage" on the final chunk.
+    
+    Yields:
+        SSE event strings ("data: {...}\n\n"), terminated by "data: [DONE]"
+    """
+    payload = _build_anthropic_payload(model, messages, temperature, max_tokens)
+    payload["stream"] = True
+    
+    headers = _auth_headers(api_key)
+    input_tokens = 0
+    output_tokens = 0
+    
+    async for event in _anthropic_events(payload, headers):
+        event_type = event.get("type")
+        if event_type == "content_block_delta":
+            delta = event.get("delta", {})
+            # Thinking deltas are dropped, same as the buffered path
+            if delta.get("type") == "text_delta":
+                yield _sse_chunk(delta.get("text", ""))
+        elif event_type == "message_start":
+            usage = event.get("message", {}).get("usage", {})
+            input_tokens = usage.get("input_tokens", input_tokens)
+            output_tokens = usage.get("output_tokens", output_tokens)
+        elif event_type == "message_delta":
+            output_tokens = event.get("usage", {}).get("output_tokens", output_tokens)
+    
+    yield _sse_chunk(None, "stop", {
+        "prompt_tokens": input_tokens,
+        "completion_tokens": output_tokens,
+        "total_tokens": input_tokens + output_tokens
+    })
+    yield "data: [DONE]\n\n"
+
+
+async def stream_openai_compatible(
+    model: str,
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+    endpoint: str,
+    api_key: str
+) -> AsyncIterator[str]:
+    """
+    Stream an OpenAI-compatible API response.
+    
+    The upstream SSE events are already in the OpenAI chunk format, so
+    each "data:" line is forwarded as soon as it arrives.
+    
+    Yields:
+        SSE event strings ("data: {...}\n\n"), terminated by "data: [DONE]"
+    """
+    payload = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "stream": True
+    }
+    
+    headers = _auth_headers(api_key)
+    
+    client = get_http_client()
+    async with _admitted(), client.stream("POST", endpoint, content=orjson.dumps(payload), headers=headers, timeout=60.0) as response:
+        if response.status_code != 200:
+            error_detail = (await response.aread()).decode(errors="replace")
+            raise Exception(f"API error {response.status_code}: {error_detail}")
+            
+        async for line in response.aiter_lines():
+            if line.startswith("data:"):
+                yield f"{line}\n\n"
+
+
+def stream_llm(
+    model: str,
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+    api_key: str
+) -> AsyncIterator[str]:
+    """
+    Unified streaming counterpart of call_llm.
+    
+    Returns:
+        Async iterator of OpenAI-style SSE event strings
+    """
+    route = _route(model)
     
-    async with httpx.AsyncClient() as client:
-        response = await client.post(endpoint, json=payload, headers=headers, timeout=60.0)
-        response.raise_for_status()
-        return response.json()
+    if route["provider"] == "minimax_anthropic":
+        return stream_minimax_anthropic(model, messages, temperature, max_tokens, api_key)
+    return stream_openai_compatible(
+        model, messages, temperature, max_tokens,
+        route["endpoint"], api_key
+    )
 
 
 def get_llm_call_function(model: str, api_key: str) -> Callable:
@@ -218,13 +548,14 @@ def get_llm_call_function(model: str, api_key: str) -> Callable:
     Returns:
         Callable function to call the LLM
     """
-    config = get_provider_and_headers(model, api_key)
+    route = _route(model)
     
-    if config["provider"] == "minimax_anthropic":
-        return lambda m, msgs, temp, tokens, ak: call_minimax_anthropic(m, msgs, temp, tokens, ak)
+    if route["provider"] == "minimax_anthropic":
+        # Same signature already - no wrapper frame needed
+        return call_minimax_anthropic
     else:
         return lambda m, msgs, temp, tokens, ak: call_openai_compatible(
-            m, msgs, temp, tokens, config["endpoint"], ak
+            m, msgs, temp, tokens, route["endpoint"], ak
         )
 
 
@@ -248,14 +579,14 @@ async def call_llm(
     Returns:
         Response dict from the LLM
     """
-    config = get_provider_and_headers(model, api_key)
+    route = _route(model)
     
-    if config["provider"] == "minimax_anthropic":
+    if route["provider"] == "minimax_anthropic":
         return await call_minimax_anthropic(
             model, messages, temperature, max_tokens, api_key
         )
     else:
         return await call_openai_compatible(
             model, messages, temperature, max_tokens,
-            config["endpoint"], api_key
+            route["endpoint"], api_key
         )
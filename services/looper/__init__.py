@@ -11,14 +11,23 @@ Modules:
 - tracer: Trace/logging functionality
 - execution_tree: Tree data structure for visualization
 """
-import uuid
-import subprocess
-from typing import List, Dict, Any, Optional, Callable
+import asyncio
+import hashlib
+import itertools
+import os
+import re
+from typing import List, Dict, Any, Optional, Callable, Tuple
 
 # Import submodules
 from .llm_client import LLMClient, run_llm_with_context
 from .code_extractor import CodeExtractor, extract_code_blocks
-from .executor import Executor, execute_code_with_podman_check, ensure_project_requirements, list_project_files
+from .executor import (
+    Executor,
+    execute_code_with_podman_check,
+    ensure_project_requirements,
+    list_project_files,
+    preview_project_files
+)
 from .debugger import DebuggerWrapper, analyze_error, get_debugger_context
 from .tracer import TraceLogger, get_trace_logger, log_trace, clear_trace, TraceCallback
 from .execution_tree import (
@@ -29,17 +38,40 @@ from .execution_tree import (
     create_execution_tree,
     build_tree_from_looper
 )
+from services import response_cache
+from services.pre_llm import ensure_pod_ready
 
 
 # =============================================================================
 # Data Models
 # =============================================================================
 
+# Node ids only need to be unique within this server process (and distinct
+# from a previous process's ids still shown in the UI) - a pid prefix plus a
+# counter does that without a uuid4 per node
+_NODE_ID_PREFIX = f"{os.getpid() & 0xffff:04x}"
+_node_ids = itertools.count(1)
+
 class CommandNode:
     """Represents a node in the command tree."""
     
+    # No per-instance __dict__ - fix trees can hold many nodes
+    __slots__ = (
+        "id",
+        "code",
+        "language",
+        "parent_id",
+        "result",
+        "error",
+        "success",
+        "fixed_code",
+        "children",
+        "level",
+        "fix_key",
+    )
+    
     def __init__(self, code: str, language: str = "python", parent_id: str = None):
-        self.id = str(uuid.uuid4().hex[:8])
+        self.id = f"{_NODE_ID_PREFIX}{next(_node_ids):04x}"
         self.code = code
         self.language = language
         self.parent_id = parent_id
@@ -49,6 +81,7 @@ class CommandNode:
         self.fixed_code = None  # Code after debugging
         self.children: List['CommandNode'] = []
         self.level = 0
+        self.fix_key: Optional[str] = None  # Fix cache key this node was generated for
     
     def to_dict(self) -> Dict:
         return {
@@ -68,6 +101,21 @@ class CommandNode:
 class LooperState:
     """Tracks the state of the looper execution."""
     
+    __slots__ = (
+        "is_running",
+        "should_stop",
+        "loop_count",
+        "max_loops",
+        "max_depth",
+        "successful_results",
+        "error_stack",
+        "debug_context",
+        "current_project_path",
+        "trace_callback",
+        "command_tree",
+        "stop_event",
+    )
+    
     def __init__(self):
         self.is_running = False
         self.should_stop = False
@@ -80,6 +128,9 @@ class LooperState:
         self.current_project_path: Optional[str] = None
         self.trace_callback: TraceCallback = None
         self.command_tree: List[CommandNode] = []  # Root nodes
+        # Set by stop() - lets in-flight pod runs and LLM calls be abandoned
+        # instead of only checking should_stop between steps
+        self.stop_event = asyncio.Event()
     
     def reset(self):
         """Reset the state for a new run."""
@@ -90,10 +141,12 @@ class LooperState:
         self.error_stack = []
         self.debug_context = []
         self.command_tree = []
+        self.stop_event = asyncio.Event()
     
     def stop(self):
         """Signal the looper to stop."""
         self.should_stop = True
+        self.stop_event.set()
 
 
 # =============================================================================
@@ -106,6 +159,51 @@ trace_logger = get_trace_logger()
 # Global looper state
 looper_state = LooperState()
 
+# Root commands allowed to run at once. Defaults to 1 because commands from one
+# LLM response usually build on each other (write a file, then run it) and all
+# share the project's pod; raise it for responses made of independent commands
+ROOT_CONCURRENCY = max(1, int(os.getenv("LOOPER_ROOT_CONCURRENCY", "1")))
+
+# Parts of an error message that differ between otherwise identical failures
+_VOLATILE_ERROR_RE = re.compile(
+    r"0x[0-9a-fA-F]+"
+    r"|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"
+    r"|line \d+"
+)
+
+# Fixes that ran successfully, shared across runs - the same failure of the
+# same code (in sibling nodes, or when a prompt is re-run) reuses a fix known
+# to work instead of costing another debug LLM round-trip
+_fix_cache = response_cache.TTLCache(maxsize=512)
+
+
+def _fix_cache_key(
+    model: str,
+    error_type: str,
+    error_message: str,
+    code: str,
+    context_files: Optional[List[Dict]],
+    debugger_context: Optional[str]
+) -> str:
+    """
+    Hash a failure, ignoring addresses/ids/line numbers, into a fix cache key.
+    
+    The pre-llm context and debugger context the fix prompt is sent with are
+    part of the key, so a fix generated under other instructions (another
+    project, an edited context file) is never served.
+    """
+    normalized = _VOLATILE_ERROR_RE.sub('', error_message).strip()[:256]
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (model, error_type, normalized, code.strip()):
+        digest.update(part.encode())
+        digest.update(b"\x00")
+    for ctx in context_files or ():
+        if ctx.get('type') == 'pre-llm':
+            digest.update(ctx.get('content', '').encode())
+            digest.update(b"\x00")
+    digest.update((debugger_context or '').encode())
+    return digest.hexdigest()
+
 
 # =============================================================================
 # Public API Functions (for backward compatibility)
@@ -131,6 +229,25 @@ def stop_looper():
 # Internal Implementation
 # =============================================================================
 
+async def _unless_stopped(awaitable) -> Tuple[bool, Any]:
+    """
+    Await awaitable, abandoning it as soon as the looper is stopped.
+    
+    Returns:
+        (stopped, result) - result is None when the stop came first
+    """
+    task = asyncio.ensure_future(awaitable)
+    stop_waiter = asyncio.ensure_future(looper_state.stop_event.wait())
+    try:
+        await asyncio.wait({task, stop_waiter}, return_when=asyncio.FIRST_COMPLETED)
+        if task.done():
+            return False, task.result()
+        return True, None
+    finally:
+        stop_waiter.cancel()
+        task.cancel()
+
+
 async def _process_command_node(
     node: CommandNode,
     llm_client: LLMClient,
@@ -143,9 +260,73 @@ async def _process_command_node(
     """
     Process a single command node - execute and handle errors with debugging.
     Returns the node with results.
+    
+    Each failed attempt yields at most one fix node, so the debug attempts
+    form a chain; it is walked with a loop rather than recursion, and a
+    successful fix is then propagated back up to every ancestor.
+    """
+    chain = [node]
+    current = node
+    while True:
+        try:
+            fix_node = await _run_node(
+                current,
+                llm_client,
+                project_path,
+                context_files,
+                max_depth,
+                user_name,
+                project_name
+            )
+        except Exception as e:
+            # Only fix attempts are contained here - a root failure still
+            # propagates to run_looper
+            if current is node:
+                raise
+            log_trace('error', 'Debug Error', str(e), looper_state.trace_callback)
+            break
+        # Only a fix that ran cleanly is handed to the next identical failure;
+        # one that fails (even a cached one, reused) is dropped so the next
+        # attempt or re-run asks the LLM afresh
+        if current.fix_key is not None:
+            if current.success:
+                _fix_cache.set(current.fix_key, {'code': current.code, 'language': current.language})
+            else:
+                _fix_cache.discard(current.fix_key)
+        if fix_node is None:
+            break
+        chain.append(fix_node)
+        current = fix_node
+    
+    # Deepest first, so "[Fixed]" prefixes nest the same way at every level
+    for i in range(len(chain) - 1, 0, -1):
+        fix_node, parent = chain[i], chain[i - 1]
+        if fix_node.success:
+            parent.success = True
+            parent.result = f"[Fixed] {fix_node.result}"
+            parent.fixed_code = fix_node.code
+    
+    return node
+
+
+async def _run_node(
+    node: CommandNode,
+    llm_client: LLMClient,
+    project_path: Optional[str],
+    context_files: List[Dict],
+    max_depth: int,
+    user_name: str,
+    project_name: str
+) -> Optional[CommandNode]:
+    """
+    Execute one node and, if it failed, ask the LLM for a fix.
+    
+    Returns:
+        The new fix node (already attached to node.children) to run next,
+        or None when there is nothing more to try
     """
     if looper_state.should_stop:
-        return node
+        return None
     
     executor = Executor()
     debugger = DebuggerWrapper()
@@ -171,9 +352,15 @@ async def _process_command_node(
     # Use standardized pod name without suffix (no node.id)
     container_name = executor.get_pod_name(user_name, project_name)
     
-    # Import and ensure pod is ready before executing
-    from services.pre_llm import ensure_pod_ready
-    pod_status = ensure_pod_ready(user_name, project_name, project_path, auto_start=True)
+    # Ensure pod is ready before executing
+    # Pod checks/startup and execution shell out to podman and block - run them
+    # on a worker thread so LLM calls and sibling nodes keep going meanwhile
+    stopped, pod_status = await _unless_stopped(asyncio.to_thread(
+        ensure_pod_ready, user_name, project_name, project_path, auto_start=True
+    ))
+    if stopped:
+        node.error = "Stopped by user"
+        return None
     
     log_trace('process', 'Pod Status', {
         'pod_name': pod_status.get('pod_name'),
@@ -185,7 +372,7 @@ async def _process_command_node(
     
     if not pod_status.get('ready', False):
         node.error = f"Pod not ready: {pod_status.get('message', 'Unknown error')}"
-        return node
+        return None
     
     # Execute the code in pod
     log_trace('process', 'Starting Pod', {
@@ -196,7 +383,19 @@ async def _process_command_node(
         'code_preview': node.code[:100] + '...' if len(node.code) > 100 else node.code
     }, looper_state.trace_callback)
     
-    exec_result = executor.execute(node.code, project_path, user_name, project_name)
+    stopped, exec_result = await _unless_stopped(asyncio.to_thread(
+        executor.execute, node.code, project_path, user_name, project_name
+    ))
+    if stopped:
+        # The worker thread is blocked in `podman exec` - killing the container
+        # ends it (the pod is started again by the next run)
+        await asyncio.to_thread(executor.cleanup_pod, container_name)
+        node.error = "Stopped by user"
+        log_trace('output', 'Pod Killed (Stopped)', {
+            'container': container_name,
+            'node_id': node.id
+        }, looper_state.trace_callback)
+        return None
     
     # Check if pod should be destroyed based on settings
     if settings.get('keep_running', True) and not settings.get('auto_destroy', False):
@@ -208,7 +407,7 @@ async def _process_command_node(
         }, looper_state.trace_callback)
     else:
         # Verify pod is actually destroyed before showing message
-        forced = executor.cleanup_pod(container_name)
+        forced = await asyncio.to_thread(executor.cleanup_pod, container_name)
         
         if not forced:
             log_trace('output', 'Pod Destroyed', {
@@ -266,7 +465,7 @@ async def _process_command_node(
         }, looper_state.trace_callback)
         # Mark this as a terminal error - don't try to debug
         node.error = "PODMAN_NOT_INSTALLED: " + (node.error or 'Podman is not installed')
-        return node
+        return None
     
     # If there's an error and we haven't reached max depth, try to debug
     if not node.success and node.level < max_depth and not looper_state.should_stop:
@@ -281,24 +480,46 @@ async def _process_command_node(
         # Get debugger context for error fixing
         debugger_context = debugger.get_context()
         
+        fix_key = _fix_cache_key(
+            llm_client.model,
+            error_info.get('error_type', 'unknown'),
+            error_info.get('error_message', ''),
+            node.code,
+            context_files,
+            debugger_context
+        )
+        
         try:
-            debug_response = await llm_client.call_for_fix(
-                error=node.error or '',
-                error_type=error_info.get('error_type', 'unknown'),
-                original_code=node.code,
-                context_files=context_files,
-                debugger_context=debugger_context
-            )
-            
-            code_blocks = extract_code_blocks(debug_response)
+            fix_block = _fix_cache.get(fix_key)
+            if fix_block is not None:
+                log_trace('process', 'Reusing Cached Fix', {
+                    'error_type': error_info.get('error_type', 'unknown'),
+                    'node_id': node.id
+                }, looper_state.trace_callback)
+            else:
+                stopped, debug_response = await _unless_stopped(llm_client.call_for_fix(
+                    error=node.error or '',
+                    error_type=error_info.get('error_type', 'unknown'),
+                    original_code=node.code,
+                    context_files=context_files,
+                    debugger_context=debugger_context
+                ))
+                if stopped:
+                    return None
+                
+                code_blocks = extract_code_blocks(debug_response)
+                if code_blocks:
+                    fix_block = code_blocks[0]
             
-            if code_blocks:
+            if fix_block is not None:
                 fix_node = CommandNode(
-                    code_blocks[0]['code'],
-                    code_blocks[0].get('language', 'python'),
+                    fix_block['code'],
+                    fix_block.get('language', 'python'),
                     node.id
                 )
                 fix_node.level = node.level + 1
+                # Cached by _process_command_node once the fix has run cleanly
+                fix_node.fix_key = fix_key
                 node.children.append(fix_node)
                 
                 # Log FIX node creation for tree visualization
@@ -312,29 +533,15 @@ async def _process_command_node(
                     'fix_for_error': node.error[:100] + '...' if node.error and len(node.error) > 100 else node.error
                 }, looper_state.trace_callback)
                 
-                await _process_command_node(
-                    fix_node,
-                    llm_client,
-                    project_path,
-                    context_files,
-                    max_depth,
-                    user_name,
-                    project_name
-                )
-                
-                if fix_node.success:
-                    node.success = True
-                    node.result = f"[Fixed] {fix_node.result}"
-                    node.fixed_code = fix_node.code
+                return fix_node
         except Exception as e:
             log_trace('error', 'Debug Error', str(e), looper_state.trace_callback)
     
-    return node
+    return None
 
 
 def get_pod_settings() -> Dict[str, Any]:
     """Get pod settings from the executor module."""
-    from .executor import Executor
     return Executor().settings
 
 
@@ -362,7 +569,6 @@ def _get_instruction_for_code(code: str, language: str) -> str:
         # Look for docstring or comments at the start
         if '"""' in first_lines or "'''" in first_lines:
             # Try to extract docstring
-            import re
             docstring_match = re.search(r'"""(.*?)"""', code, re.DOTALL)
             if docstring_match:
                 instruction = docstring_match.group(1).strip()[:100]
@@ -447,8 +653,8 @@ async def run_looper(
         req_result = ensure_project_requirements(project_path)
         log_trace('process', 'Project Requirements', req_result, trace_callback)
         
-        project_files = list_project_files(project_path)
-        log_trace('process', 'Project Files', {'count': len(project_files), 'files': project_files[:10]}, trace_callback)
+        file_count, first_files = preview_project_files(project_path)
+        log_trace('process', 'Project Files', {'count': file_count, 'files': first_files}, trace_callback)
     
     try:
         # Create LLM client
@@ -458,10 +664,21 @@ async def run_looper(
         log_trace('process', 'Calling LLM for Commands', {'prompt': initial_prompt[:100]}, trace_callback)
         
         # The pre-llm context file already contains prompt engineering to generate code
-        llm_response = await llm_client.call(
+        stopped, llm_response = await _unless_stopped(llm_client.call(
             initial_prompt,
             context_files=context_files
-        )
+        ))
+        if stopped:
+            looper_state.is_running = False
+            return {
+                "success": False,
+                "response": "",
+                "command_tree": [],
+                "loop_count": looper_state.loop_count,
+                "successful_results": [],
+                "stopped": True,
+                "trace_entries": trace_logger.get_all()
+            }
         
         log_trace('output', 'LLM Response', {
             'length': len(llm_response),
@@ -483,41 +700,71 @@ async def run_looper(
         
         log_trace('process', 'Extracted Commands', {'count': len(code_blocks)}, trace_callback)
         
-        # Step 3: Create root nodes and ADD THEM TO TREE IMMEDIATELY for real-time visualization
-        for i, block in enumerate(code_blocks):
-            if looper_state.should_stop:
-                break
-            
-            # Create root node
-            root_node = CommandNode(
-                block['code'],
-                block.get('language', 'python'),
-                None
-            )
-            root_node.level = 0
-            looper_state.command_tree.append(root_node)
-            
-            # IMMEDIATELY log L1 node creation for real-time tree visualization
-            log_trace('tree_node', f'L1 Node Created: Command {i+1}', {
-                'node_id': root_node.id,
-                'code_preview': root_node.code[:100] + '...' if len(root_node.code) > 100 else root_node.code,
-                'language': root_node.language,
-                'instruction': _get_instruction_for_code(root_node.code, root_node.language),
-                'level': 0,
-                'index': i
-            }, trace_callback)
-            
-            # Process this node (will handle errors recursively)
-            await _process_command_node(
-                root_node,
-                llm_client,
-                project_path,
-                context_files,
-                looper_state.max_depth,
-                user_name,
-                project_name
-            )
-            
+        # Step 3: Create root nodes and ADD THEM TO TREE IMMEDIATELY for real-time visualization.
+        # Root commands run under a semaphore; slots are granted in order, so with
+        # the default of 1 each command still sees the effects of the ones before it
+        root_slots = asyncio.Semaphore(ROOT_CONCURRENCY)
+        # Set when a root raises, so commands still waiting for a slot don't start
+        roots_aborted = asyncio.Event()
+        
+        async def run_root(i: int, block: Dict[str, Any]) -> Optional[CommandNode]:
+            async with root_slots:
+                if looper_state.should_stop or roots_aborted.is_set():
+                    return None
+                
+                # Create root node
+                root_node = CommandNode(
+                    block['code'],
+                    block.get('language', 'python'),
+                    None
+                )
+                root_node.level = 0
+                looper_state.command_tree.append(root_node)
+                
+                # IMMEDIATELY log L1 node creation for real-time tree visualization
+                log_trace('tree_node', f'L1 Node Created: Command {i+1}', {
+                    'node_id': root_node.id,
+                    'code_preview': root_node.code[:100] + '...' if len(root_node.code) > 100 else root_node.code,
+                    'language': root_node.language,
+                    'instruction': _get_instruction_for_code(root_node.code, root_node.language),
+                    'level': 0,
+                    'index': i
+                }, trace_callback)
+                
+                # Process this node (will handle errors recursively)
+                try:
+                    return await _process_command_node(
+                        root_node,
+                        llm_client,
+                        project_path,
+                        context_files,
+                        looper_state.max_depth,
+                        user_name,
+                        project_name
+                    )
+                except Exception:
+                    # Flagged before the slot is released to the next command
+                    roots_aborted.set()
+                    raise
+        
+        root_tasks = [
+            asyncio.ensure_future(run_root(i, block))
+            for i, block in enumerate(code_blocks)
+        ]
+        try:
+            root_nodes = await asyncio.gather(*root_tasks)
+        except BaseException:
+            # A failing root ends the run - cancel the commands still running
+            # and wait for them to unwind before the error result is built
+            for task in root_tasks:
+                task.cancel()
+            await asyncio.gather(*root_tasks, return_exceptions=True)
+            raise
+        
+        # Record outcomes in command order, whatever order they finished in
+        for root_node in root_nodes:
+            if root_node is None:
+                continue
             # If successful, add to results
             if root_node.success:
                 looper_state.successful_results.append(root_node.result)
@@ -551,11 +798,6 @@ async def run_looper(
         
         final_response = "\n\n".join(response_parts)
         
-        # Also add raw results to successful_results for backward compatibility
-        for node in looper_state.command_tree:
-            if node.success:
-                looper_state.successful_results.append(node.result)
-        
         looper_state.is_running = False
         
         # All pods are destroyed at this point (--rm flag removes containers after execution)
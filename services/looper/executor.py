@@ -2,8 +2,9 @@
 Executor module - Runs code in pods.
 Provides execution functionality for the looper.
 """
+import os
 import subprocess
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 
 from services.run_pod_test import (
     run_code_in_pod,
@@ -178,21 +179,81 @@ def ensure_project_requirements(project_path: str) -> Dict[str, Any]:
         return {"exists": False, "created": False, "path": None, "message": str(e)}
 
 
+# project_path -> ({directory: st_mtime_ns}, sorted relative file paths)
+_project_files_cache: Dict[str, Tuple[Dict[str, int], List[str]]] = {}
+
+
+def _walk_project_files(project_path: str) -> Tuple[Dict[str, int], List[str]]:
+    """
+    Collect every file under project_path with os.scandir, plus the mtime of
+    each directory visited (adding, removing or renaming an entry bumps the
+    mtime of the directory holding it).
+    
+    Like Path.rglob, symlinked directories are not descended into.
+    """
+    dir_mtimes = {}
+    files = []
+    prefix_len = len(os.path.join(project_path, ""))
+    pending = [project_path]
+    while pending:
+        directory = pending.pop()
+        try:
+            dir_mtimes[directory] = os.stat(directory).st_mtime_ns
+            entries = os.scandir(directory)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.is_file():
+                        files.append(entry.path[prefix_len:])
+                except OSError:
+                    continue
+    files.sort()
+    return dir_mtimes, files
+
+
+def _cached_project_files(project_path: str) -> List[str]:
+    """
+    Return the (shared, not copied) sorted file list for a project.
+    
+    Cached per project until one of its directories changes - a repeat call
+    stats the directories instead of walking the whole tree.
+    """
+    cached = _project_files_cache.get(project_path)
+    if cached is not None:
+        try:
+            if all(
+                os.stat(directory).st_mtime_ns == mtime
+                for directory, mtime in cached[0].items()
+            ):
+                return cached[1]
+        except OSError:
+            pass
+    
+    dir_mtimes, files = _walk_project_files(project_path)
+    _project_files_cache[project_path] = (dir_mtimes, files)
+    return files
+
+
 def list_project_files(project_path: str) -> list:
     """List all files in a project."""
-    from pathlib import Path
-    
-    if not project_path:
+    if not project_path or not os.path.isdir(project_path):
         return []
-    project_dir = Path(project_path)
-    if not project_dir.exists():
-        return []
-    files = []
-    try:
-        for item in project_dir.rglob("*"):
-            if item.is_file():
-                rel_path = item.relative_to(project_dir)
-                files.append(str(rel_path))
-    except:
-        pass
-    return sorted(files)
+    return list(_cached_project_files(project_path))
+
+
+def preview_project_files(project_path: str, limit: int = 10) -> Tuple[int, List[str]]:
+    """
+    Count a project's files and return the first few, without copying the
+    whole list (for trace output, which only shows a handful).
+    
+    Returns:
+        Tuple of (total file count, first `limit` files)
+    """
+    if not project_path or not os.path.isdir(project_path):
+        return 0, []
+    files = _cached_project_files(project_path)
+    return len(files), files[:limit]
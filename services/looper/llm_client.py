@@ -2,7 +2,18 @@
 LLM Client module - Handles LLM API interactions.
 Provides a clean interface for calling the LLM with context.
 """
-from typing import List, Dict, Any, Callable, Optional
+import asyncio
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+from services import response_cache
+from services.looper.debugger import DebuggerWrapper
+
+# Upstream calls in progress, by request key - an identical request made
+# meanwhile (same model, messages and sampling settings, e.g. the same error
+# in two parallel nodes) shares that answer. Nothing is kept once the call
+# finishes: completions are sampled, so a retry must get a fresh one. Keyed
+# by event loop too, as a future can only be awaited on the loop it belongs to
+_inflight_calls: Dict[Tuple[asyncio.AbstractEventLoop, str], "asyncio.Future[str]"] = {}
 
 
 class LLMClient:
@@ -104,15 +115,39 @@ class LLMClient:
         temp = temperature if temperature is not None else self.temperature
         tokens = max_tokens if max_tokens is not None else self.max_tokens
         
-        result = await self.call_llm_func(
-            self.model,
-            messages,
-            temp,
-            tokens,
-            self.api_key
-        )
+        loop = asyncio.get_running_loop()
+        call_key = (loop, response_cache.make_key(self.model, messages, temp, tokens))
+        while (pending := _inflight_calls.get(call_key)) is not None:
+            await asyncio.wait((pending,))
+            if not pending.cancelled() and pending.exception() is None:
+                return pending.result()
+            # The shared call failed - make our own (unless another waiter
+            # already started one)
+        
+        shared = loop.create_future()
+        _inflight_calls[call_key] = shared
+        try:
+            result = await self.call_llm_func(
+                self.model,
+                messages,
+                temp,
+                tokens,
+                self.api_key
+            )
+            content = result["choices"][0]["message"]["content"]
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                shared.cancel()
+            else:
+                shared.set_exception(e)
+                shared.exception()  # Retrieved - no "never retrieved" warning
+            raise
+        else:
+            shared.set_result(content)
+        finally:
+            del _inflight_calls[call_key]
         
-        return result["choices"][0]["message"]["content"]
+        return content
     
     async def call_for_fix(
         self,
@@ -136,7 +171,6 @@ class LLMClient:
             The LLM response with fixed code
         """
         # Use the improved fix prompt from DebuggerWrapper
-        from services.looper.debugger import DebuggerWrapper
         fix_prompt = DebuggerWrapper.create_fix_prompt(error, error_type, original_code)
         
         return await self.call(
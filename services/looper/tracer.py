@@ -8,18 +8,25 @@ from datetime import datetime
 from dataclasses import dataclass, field
 import threading
 
+from services.trace_log import add_trace_entry
+
 
 # Callback type for trace logging
 TraceCallback = Optional[Callable[[str, str, Any], None]]
 
 
+def _now_hms() -> str:
+    """Current local time as HH:MM:SS.mmm (isoformat is ~2x faster than strftime)."""
+    return datetime.now().isoformat(timespec="milliseconds")[11:]
+
+
 @dataclass
 class TraceEntry:
     """Single trace entry."""
     type: str
     label: str
     data: Any
-    time: str = field(default_factory=lambda: datetime.now().strftime("%H:%M:%S.%f")[:-3])  # Include milliseconds
+    time: str = field(default_factory=_now_hms)  # Include milliseconds
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for JSON serialization."""
@@ -70,14 +77,9 @@ class TraceLogger:
         with self._lock:
             self.entries.append(entry)
             
-            # Also write to file for persistence
-            if self._persist_to_file:
-                try:
-                    from services.trace_log import add_trace_entry
-                    if self._trace_id:
-                        add_trace_entry(self._trace_id, type, label, data)
-                except ImportError:
-                    pass  # trace_log module not available
+            # Also write to file for persistence (only within a trace session)
+            if self._persist_to_file and self._trace_id:
+                add_trace_entry(self._trace_id, type, label, data)
     
     def clear(self) -> None:
         """Clear all entries (thread-safe)."""
@@ -13,6 +13,7 @@ Rules:
 - Use underscores (_) only in user names when part of the login (e.g., test_user)
 - All internal lookups should normalize to ensure consistency
 """
+import functools
 import re
 from typing import Tuple, Optional
 
@@ -35,6 +36,7 @@ def normalize_project_id(user_name: str, project_name: str) -> str:
     return f"{user_name}-{project_name}"
 
 
+@functools.lru_cache(maxsize=4096)
 def parse_project_id(project_id: str) -> Tuple[Optional[str], Optional[str]]:
     """
     Parse project_id into (user_name, project_name).
@@ -43,6 +45,8 @@ def parse_project_id(project_id: str) -> Tuple[Optional[str], Optional[str]]:
     - user-project -> ("user", "project") 
     - user_project -> ("user", "project")
     
+    Results are cached - the mapping is pure and the set of projects is small.
+    
     Args:
         project_id: The project identifier
     
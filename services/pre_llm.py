@@ -9,6 +9,7 @@ import re
 from pathlib import Path
 from services.run_pod_test import get_pod_name, get_pod_settings, allocate_port
 from services.naming import parse_project_id
+from services.context_files import load_project_only_context_files, load_project_context_settings, load_context_defaults
 
 
 def find_requirements_file(project_path: str) -> str:
@@ -526,8 +527,6 @@ def get_pre_llm_context_content(project_id: str) -> str:
     Returns:
         The content of the pre-LLM context file, or empty string if not found
     """
-    from services.context_files import load_project_only_context_files, load_project_context_settings, load_context_defaults
-    
     # Load context files from PROJECT FOLDER ONLY (no global fallback)
     context_files = load_project_only_context_files(project_id)
     
@@ -0,0 +1,94 @@
+"""
+Response Cache Service
+In-process LRU + TTL cache for chat completion responses, so identical
+requests (retries, UI re-renders) skip the upstream LLM call.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Defaults: enough entries for a busy dev box, short enough TTL that
+# answers don't go stale
+DEFAULT_MAXSIZE = 4096
+DEFAULT_TTL = 300.0
+# Longest a duplicate request waits on the in-flight original (upstream timeout)
+INFLIGHT_WAIT = 60.0
+
+
+def make_key(
+    model: str,
+    messages: List[Dict[str, str]],
+    temperature: Optional[float],
+    max_tokens: Optional[int]
+) -> str:
+    """Hash the request fields that determine a completion into a cache key."""
+    raw = json.dumps(
+        [model, messages, temperature, max_tokens],
+        separators=(",", ":"),
+        ensure_ascii=False
+    )
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+class TTLCache:
+    """LRU cache whose entries also expire ttl seconds after being stored."""
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, ttl: float = DEFAULT_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        # key -> Event set when the request computing that key finishes
+        self._inflight: Dict[str, asyncio.Event] = {}
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired."""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a value, evicting the least recently used entry when full."""
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        """Drop key if present (e.g. a cached answer turned out to be wrong)."""
+        self._data.pop(key, None)
+
+    async def wait_inflight(self, key: str) -> None:
+        """If another request is already computing key, wait for it to finish."""
+        event = self._inflight.get(key)
+        if event is None:
+            return
+        try:
+            await asyncio.wait_for(event.wait(), INFLIGHT_WAIT)
+        except asyncio.TimeoutError:
+            # The original never reported back (e.g. its client vanished) -
+            # drop the stale marker so later requests don't wait on it too
+            if self._inflight.get(key) is event:
+                del self._inflight[key]
+
+    def begin(self, key: str) -> None:
+        """Mark key as being computed so concurrent identical requests wait."""
+        self._inflight.setdefault(key, asyncio.Event())
+
+    def end(self, key: str) -> None:
+        """Release requests waiting on key (whether or not a value was stored)."""
+        event = self._inflight.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        self._data.clear()
@@ -4,6 +4,7 @@ Spins up a podman pod to run code and return results.
 """
 import subprocess
 import os
+import shutil
 import uuid
 import re
 import time
@@ -216,17 +217,18 @@ def kill_pod(user_name: str, project_name: str) -> Dict[str, Any]:
     }
 
 
+# Set once podman has been found - it doesn't get uninstalled under a running
+# server, while a missing podman is re-checked so installing it needs no restart
+_podman_found = False
+
+
 def ensure_podman_installed():
     """Check if podman is installed, if not return False."""
-    try:
-        result = subprocess.run(
-            ['which', 'podman'],
-            capture_output=True,
-            text=True
-        )
-        return result.returncode == 0
-    except:
-        return False
+    global _podman_found
+    if not _podman_found:
+        # In-process PATH lookup - no `which` subprocess even while it's missing
+        _podman_found = shutil.which('podman') is not None
+    return _podman_found
 
 
 def find_requirements_file(project_path: str) -> str:
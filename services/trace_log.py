@@ -23,12 +23,9 @@ TRACE_LOG_DIR.mkdir(exist_ok=True)
 
 def _load_trace_log() -> List[Dict[str, Any]]:
     """Load trace log from file."""
-    if not TRACE_LOG_FILE.exists():
-        return []
     try:
-        with open(TRACE_LOG_FILE, "r") as f:
-            return json.load(f)
-    except:
+        return json.loads(TRACE_LOG_FILE.read_bytes())
+    except (OSError, ValueError):
         return []
 
 